@@ -0,0 +1,84 @@
+"""
+Build step for the precomputed spec table (util/spec_table.py).
+
+Precomputes the merged genres, descriptors and audio_features for every
+single keyword in the keyword map, plus the top-K keyword pairs seen in a
+corpus of real inputs (e.g. a traffic log from traffic_recorder.py):
+
+    python -m backend.build_spec_table --corpus traffic.jsonl --top-k 500
+
+The server memory-maps the result (SPEC_TABLE_PATH) at startup and ignores
+it if the keyword data has changed since it was built.
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import sys
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from . import mood_to_playlist as mtp
+from .util.spec_table import SpecTableEntry, write_spec_table
+
+TEXT_FIELDS = ("mood", "activity", "music", "emotion_text", "activity_text", "music_text")
+
+
+def corpus_texts(path: str) -> Iterable[str]:
+    """Yields the combined input text of each JSONL record (raw or traffic-log shaped)."""
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(rec, dict):
+                continue
+            body = rec.get("body") if isinstance(rec.get("body"), dict) else rec
+            # same words interpret_mood feeds the keyword index (PII and markup excluded)
+            text = " ".join(w for f in TEXT_FIELDS for w in mtp.preprocess_text(str(body.get(f) or ""))[1])
+            if text:
+                yield text
+
+
+def count_pairs(texts: Iterable[str], keyword_map: Dict[str, Dict[str, Any]]) -> Counter:
+    """Counts inputs whose tokens match exactly two keywords (the table's pair key)."""
+    pairs: Counter = Counter()
+    for text in texts:
+        matched = [t for t in mtp.tokenize(text) if t in keyword_map]
+        if len(matched) == 2:
+            pairs[tuple(matched)] += 1
+    return pairs
+
+
+def build_entries(pairs: List[Tuple[str, ...]]) -> Dict[Tuple[str, ...], SpecTableEntry]:
+    entries: Dict[Tuple[str, ...], SpecTableEntry] = {}
+    keyword_map = mtp.KEYWORD_INDEX.keyword_map
+    for keyword in keyword_map:
+        entries[(keyword,)] = mtp.merge_keyword_entries([keyword], keyword_map)
+    for pair in pairs:
+        entries[pair] = mtp.merge_keyword_entries(list(pair), keyword_map)
+    return entries
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Precompute the keyword spec table")
+    parser.add_argument("--out", default=mtp.SPEC_TABLE_PATH, help="artifact path")
+    parser.add_argument("--corpus", action="append", default=[], help="JSONL inputs to mine keyword pairs from")
+    parser.add_argument("--top-k", type=int, default=500, help="number of most frequent pairs to include")
+    args = parser.parse_args(argv)
+
+    keyword_map = mtp.KEYWORD_INDEX.keyword_map
+    pair_counts: Counter = Counter()
+    for path in args.corpus:
+        pair_counts.update(count_pairs(corpus_texts(path), keyword_map))
+    top_pairs = [pair for pair, _ in pair_counts.most_common(max(0, args.top_k))]
+
+    entries = build_entries(top_pairs)
+    written = write_spec_table(args.out, entries, mtp.keyword_map_digest(keyword_map))
+    print(f"Wrote {written} entries ({len(keyword_map)} keywords, {len(top_pairs)} pairs) to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
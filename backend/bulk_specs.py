@@ -0,0 +1,352 @@
+"""
+Offline bulk PlaylistSpec generation for large mood corpora.
+
+Streams JSONL or CSV input rows (InterpretRequest fields: mood, activity,
+music, avoid_explicit, genres, scores, optional id) through interpret_mood
+on a process pool, and writes validated specs in input order:
+
+    python -m backend.bulk_specs corpus.jsonl specs.jsonl --workers 8
+    python -m backend.bulk_specs corpus.csv specs_parquet --format parquet --no-llm
+
+Work is shipped in chunks and only a bounded window of chunks is in flight,
+so memory stays constant regardless of corpus size. Progress is checkpointed
+next to the output (<output>.ckpt); rerunning the same command resumes.
+JSONL output resumes after the last written chunk; parquet output resumes
+after the last closed part, so an interrupted run redoes at most
+--part-rows rows. An existing output without a checkpoint is never
+overwritten unless --restart is given.
+
+Rows that cannot be parsed are still numbered and come out as
+{"row": n, "error": "invalid JSON"}.
+"""
+
+from __future__ import annotations
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+CHUNK_SIZE = 256              # rows per work unit sent to a worker
+INFLIGHT_PER_WORKER = 2       # chunks queued per worker (bounds memory)
+PARQUET_PART_ROWS = 10_000    # rows per parquet part file (a part is the resume unit)
+PROGRESS_INTERVAL_SECONDS = 5.0
+INVALID_JSON = "invalid JSON"
+
+
+# --------------------------
+# Input
+# --------------------------
+def _split_list(value: Any) -> List[str]:
+    if isinstance(value, list):
+        return [str(v) for v in value if v]
+    if not value:
+        return []
+    return [v.strip() for v in str(value).replace("|", ";").split(";") if v.strip()]
+
+
+def _parse_scores(value: Any) -> Dict[str, Any]:
+    if isinstance(value, dict):
+        return value
+    if not value:
+        return {}
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def _truthy(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "y")
+    return bool(value)
+
+
+def normalize_row(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Maps a JSONL object or CSV row onto interpret_mood arguments."""
+    return {
+        "id": raw.get("id"),
+        "mood": str(raw.get("mood") or raw.get("emotion") or ""),
+        "activity": str(raw.get("activity") or ""),
+        "music": str(raw.get("music") or ""),
+        "avoid_explicit": _truthy(raw.get("avoid_explicit", False)),
+        "genres": _split_list(raw.get("genres")),
+        "scores": _parse_scores(raw.get("scores")),
+    }
+
+
+def read_rows(path: str) -> Iterator[Dict[str, Any]]:
+    """Lazily yields normalized rows; malformed JSONL lines become error markers to keep numbering stable."""
+    with open(path, newline="", encoding="utf-8") as fh:
+        if path.lower().endswith(".csv"):
+            for raw in csv.DictReader(fh):
+                yield normalize_row(raw)
+            return
+        for line in fh:
+            if not line.strip():
+                continue
+            try:
+                raw = json.loads(line)
+            except ValueError:
+                raw = None
+            yield normalize_row(raw) if isinstance(raw, dict) else {"error": INVALID_JSON}
+
+
+def chunked(rows: Iterator[Dict[str, Any]], start_row: int, size: int) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+    numbered = enumerate(rows)
+    # skip rows already written by a previous run
+    for _ in islice(numbered, start_row):
+        pass
+    while True:
+        chunk = list(islice(numbered, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# --------------------------
+# Worker side
+# --------------------------
+def _init_worker(use_llm: bool) -> None:
+    from . import mood_to_playlist as mtp
+    mtp.USE_LLM = use_llm
+
+
+def interpret_chunk(chunk: List[Tuple[int, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    from .mood_to_playlist import interpret_mood
+
+    out = []
+    for row_no, row in chunk:
+        if "error" in row:
+            out.append({"row": row_no, "error": row["error"]})
+            continue
+        record: Dict[str, Any] = {"row": row_no, "id": row.get("id")}
+        try:
+            spec = interpret_mood(
+                emotion_text=row["mood"],
+                activity_text=row["activity"],
+                music_text=row["music"],
+                user_scores=row["scores"],
+                explicit_flag=row["avoid_explicit"],
+                preferred_genres=row["genres"],
+            )
+            record["spec"] = spec.model_dump()
+        except Exception as e:
+            record["error"] = str(e)
+        out.append(record)
+    return out
+
+
+# --------------------------
+# Output + checkpoint
+# --------------------------
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(state, fh)
+    os.replace(tmp, path)
+
+
+def output_has_data(path: str) -> bool:
+    if os.path.isdir(path):
+        return any(name.endswith(".parquet") for name in os.listdir(path))
+    return os.path.isfile(path) and os.path.getsize(path) > 0
+
+
+class JsonlSink:
+    def __init__(self, path: str, checkpoint: Dict[str, Any]) -> None:
+        self.path = path
+        self.rows_done = int(checkpoint.get("rows_done", 0))
+        self._fh = open(path, "a+b")
+        # drop anything written after the last checkpoint (a partial chunk)
+        self._fh.truncate(int(checkpoint.get("output_bytes", 0)))
+        self._fh.seek(0, os.SEEK_END)
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        for rec in records:
+            self._fh.write((json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.rows_done += len(records)
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        return {"format": "jsonl", "rows_done": self.rows_done, "output_bytes": self._fh.tell()}
+
+    def close(self) -> Dict[str, Any]:
+        state = self.checkpoint_state()
+        self._fh.close()
+        return state
+
+
+class ParquetSink:
+    """Directory of parquet part files; a part is committed to the checkpoint when closed."""
+
+    def __init__(self, path: str, checkpoint: Dict[str, Any], part_rows: int = PARQUET_PART_ROWS) -> None:
+        import pyarrow as pa  # type: ignore
+        import pyarrow.parquet as pq  # type: ignore
+
+        self._pa, self._pq = pa, pq
+        self.path = path
+        self.part_rows = part_rows
+        self.parts: List[str] = list(checkpoint.get("parts", []))
+        self.rows_done = int(checkpoint.get("rows_done", 0))
+        os.makedirs(path, exist_ok=True)
+        # remove parts from an interrupted run that never reached the checkpoint
+        for name in os.listdir(path):
+            if name.endswith(".parquet") and name not in self.parts:
+                os.unlink(os.path.join(path, name))
+        self._schema = pa.schema([
+            ("row", pa.int64()), ("id", pa.string()), ("spec", pa.string()), ("error", pa.string()),
+        ])
+        self._writer: Any = None
+        self._part_name = ""
+        self._part_count = 0
+        self._pending_rows = 0
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        if self._writer is None:
+            self._part_name = f"part-{len(self.parts):05d}.parquet"
+            self._writer = self._pq.ParquetWriter(os.path.join(self.path, self._part_name), self._schema)
+            self._part_count = 0
+        table = self._pa.table({
+            "row": [r["row"] for r in records],
+            "id": [None if r.get("id") is None else str(r["id"]) for r in records],
+            "spec": [json.dumps(r["spec"]) if "spec" in r else None for r in records],
+            "error": [r.get("error") for r in records],
+        }, schema=self._schema)
+        self._writer.write_table(table)
+        self._part_count += len(records)
+        self._pending_rows += len(records)
+        if self._part_count >= self.part_rows:
+            self._close_part()
+
+    def _close_part(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self.parts.append(self._part_name)
+            self.rows_done += self._pending_rows
+            self._pending_rows = 0
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        return {"format": "parquet", "rows_done": self.rows_done, "parts": self.parts}
+
+    def close(self) -> Dict[str, Any]:
+        self._close_part()
+        return self.checkpoint_state()
+
+
+# --------------------------
+# Pipeline
+# --------------------------
+def run(
+    input_path: str,
+    output_path: str,
+    fmt: str = "jsonl",
+    workers: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+    use_llm: bool = True,
+    resume: bool = True,
+    part_rows: int = PARQUET_PART_ROWS,
+) -> Dict[str, Any]:
+    checkpoint_path = f"{output_path.rstrip(os.sep)}.ckpt"
+    checkpoint = load_checkpoint(checkpoint_path) if resume else {}
+    if checkpoint.get("format", fmt) != fmt:
+        raise SystemExit(f"Checkpoint {checkpoint_path} was written for format {checkpoint['format']!r}")
+    if resume and not checkpoint and output_has_data(output_path):
+        # without a checkpoint the sinks would start from row 0 and wipe the existing output
+        raise SystemExit(f"{output_path} already exists without a checkpoint; pass --restart to overwrite it")
+    if fmt == "parquet":
+        sink: Any = ParquetSink(output_path, checkpoint, part_rows=part_rows)
+    else:
+        sink = JsonlSink(output_path, checkpoint)
+    start_row = sink.rows_done
+    workers = workers or os.cpu_count() or 1
+    window = workers * INFLIGHT_PER_WORKER
+
+    chunks = chunked(read_rows(input_path), start_row, chunk_size)
+    inflight: Dict[int, Future] = {}
+    next_submit = next_write = 0
+    written = 0
+    started = last_report = time.monotonic()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(use_llm,)) as pool:
+        exhausted = False
+        while True:
+            # keep the window full; results are written strictly in submission order
+            while not exhausted and len(inflight) < window:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                inflight[next_submit] = pool.submit(interpret_chunk, chunk)
+                next_submit += 1
+            if next_write not in inflight:
+                break
+            records = inflight.pop(next_write).result()
+            next_write += 1
+            sink.write(records)
+            written += len(records)
+            save_checkpoint(checkpoint_path, sink.checkpoint_state())
+
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL_SECONDS:
+                last_report = now
+                rate = written / (now - started)
+                print(f"{start_row + written} rows done ({rate:,.0f} rows/s)", file=sys.stderr)
+
+    save_checkpoint(checkpoint_path, sink.close())
+    elapsed = time.monotonic() - started
+    summary = {
+        "rows_written": written,
+        "rows_total": start_row + written,
+        "resumed_from": start_row,
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(written / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    print(json.dumps(summary), file=sys.stderr)
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate PlaylistSpecs for a mood corpus")
+    parser.add_argument("input", help="JSONL or .csv file of InterpretRequest-shaped rows")
+    parser.add_argument("output", help="JSONL file, or a directory for --format parquet")
+    parser.add_argument("--format", choices=("jsonl", "parquet"), default="jsonl")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per work unit")
+    parser.add_argument("--no-llm", action="store_true", help="deterministic specs only")
+    parser.add_argument("--part-rows", type=int, default=PARQUET_PART_ROWS,
+                        help="rows per parquet part; a resumed run redoes at most one part")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore an existing checkpoint and overwrite the output")
+    args = parser.parse_args(argv)
+
+    run(
+        args.input,
+        args.output,
+        fmt=args.format,
+        workers=args.workers,
+        chunk_size=max(1, args.chunk_size),
+        use_llm=not args.no_llm,
+        resume=not args.restart,
+        part_rows=max(1, args.part_rows),
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
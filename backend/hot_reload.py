@@ -0,0 +1,79 @@
+from __future__ import annotations
+import os
+import threading
+from typing import Any, Optional
+
+from . import mood_to_playlist as mtp
+
+try:
+    from watchdog.events import FileSystemEventHandler  # type: ignore
+    from watchdog.observers import Observer  # type: ignore
+except ImportError:  # watchdog is optional; without it maps only load at startup
+    FileSystemEventHandler = object  # type: ignore[assignment,misc]
+    Observer = None
+
+# Editors often write a file in several steps; wait for them to settle
+RELOAD_DEBOUNCE_SECONDS = 0.5
+RELOAD_EVENT_TYPES = {"created", "modified", "moved", "closed"}
+
+
+class KeywordDataWatcher(FileSystemEventHandler):  # type: ignore[misc]
+    """
+    Watches keyword_to_feature.csv / genre_normalization.csv and rebuilds
+    mood_to_playlist.KEYWORD_INDEX in the background when either changes.
+    """
+
+    def __init__(self, paths: Optional[list] = None, debounce_seconds: float = RELOAD_DEBOUNCE_SECONDS) -> None:
+        super().__init__()
+        self.paths = {os.path.abspath(p) for p in (paths or [mtp.KEYWORD_CSV_PATH, mtp.GENRE_CSV_PATH])}
+        self.debounce_seconds = debounce_seconds
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self._observer: Any = None
+        self.reloads = 0
+
+    def on_any_event(self, event: Any) -> None:
+        # opened / closed_no_write events fire on our own reads; ignore them
+        if getattr(event, "is_directory", False) or event.event_type not in RELOAD_EVENT_TYPES:
+            return
+        touched = {os.path.abspath(p) for p in (getattr(event, "src_path", None), getattr(event, "dest_path", None)) if p}
+        if touched & self.paths:
+            self.schedule_reload()
+
+    def schedule_reload(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce_seconds, self._reload)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _reload(self) -> None:
+        try:
+            changed = mtp.reload_keyword_index()
+        except Exception as e:
+            print(f"❌ Keyword data reload failed, keeping previous maps: {e}")
+            return
+        self.reloads += 1
+        print(f"✅ Keyword data reloaded ({len(changed)} keywords changed)")
+
+    def start(self) -> bool:
+        """Starts watching; returns False when watchdog is unavailable."""
+        if Observer is None:
+            print("⚠️ watchdog not installed; keyword data hot reload disabled")
+            return False
+        self._observer = Observer()
+        for directory in {os.path.dirname(p) for p in self.paths}:
+            self._observer.schedule(self, directory, recursive=False)
+        self._observer.daemon = True
+        self._observer.start()
+        return True
+
+    def stop(self) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=2)
+            self._observer = None
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
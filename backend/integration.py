@@ -1,14 +1,39 @@
 from __future__ import annotations
-from fastapi import FastAPI, HTTPException  # type: ignore
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response  # type: ignore
 from fastapi.middleware.cors import CORSMiddleware  # type: ignore
-from pydantic import BaseModel  # type: ignore
-from typing import List, Dict, Any, Optional
+from fastapi.responses import FileResponse  # type: ignore
+from pydantic import BaseModel, Field, ValidationError  # type: ignore
+from typing import AsyncIterator, List, Dict, Any, Optional, Set
 
-from .mood_to_playlist import interpret_mood, PlaylistSpec
-from .spotify_client import SpotifyClient
+from . import mood_to_playlist as mtp
+from .mood_to_playlist import interpret_mood, PlaylistSpec, LLM_BREAKER
+from .hot_reload import KeywordDataWatcher
+from .preview_cache import PreviewCache
+from .refinement import MAX_POOL_TRACKS, RefinementSession, SessionStore, apply_delta, select_tracks
+from .spotify_client import LARGE_PLAYLIST_MAX_TRACKS, SpotifyClient
+from .traffic_recorder import TrafficRecorderMiddleware
+from .util.http_cache import ResponseCache, dumps, json_response, request_key
 
 
-app = FastAPI(title="VibeChef API", version="0.1.0")
+# Reload keyword/genre CSVs on change without restarting workers
+HOT_RELOAD = os.getenv("VIBECHEF_HOT_RELOAD", "1") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:  # type: ignore[misc]
+    watcher = KeywordDataWatcher() if HOT_RELOAD else None
+    if watcher:
+        watcher.start()
+    try:
+        yield
+    finally:
+        if watcher:
+            watcher.stop()
+
+
+app = FastAPI(title="VibeChef API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,19 +43,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Record sanitized /api/* traffic for replay load tests (see replay_traffic.py)
+TRAFFIC_LOG_PATH = os.getenv("VIBECHEF_TRAFFIC_LOG")
+if TRAFFIC_LOG_PATH:
+    app.add_middleware(TrafficRecorderMiddleware, path=TRAFFIC_LOG_PATH)
+
+
+# Free-text fields past what preprocessing scans are rejected rather than silently cut
+MAX_INPUT_CHARS = mtp.MAX_SCAN_CHARS
+MAX_REQUEST_GENRES = 10
+
 
 class InterpretRequest(BaseModel):  # type: ignore[misc]
-    mood: str
-    activity: Optional[str] = ""
-    music: Optional[str] = ""
+    mood: str = Field(..., max_length=MAX_INPUT_CHARS)
+    activity: Optional[str] = Field("", max_length=MAX_INPUT_CHARS)
+    music: Optional[str] = Field("", max_length=MAX_INPUT_CHARS)
     avoid_explicit: bool = False
-    genres: Optional[List[str]] = None
+    genres: Optional[List[str]] = Field(None, max_length=MAX_REQUEST_GENRES)
     scores: Optional[Dict[str, Any]] = None
 
 
 class SearchRequest(BaseModel):  # type: ignore[misc]
     spec: Dict[str, Any]
-    count: int = 30
+    count: int = Field(30, ge=1, le=LARGE_PLAYLIST_MAX_TRACKS)
+
+
+class RefineSessionRequest(BaseModel):  # type: ignore[misc]
+    spec: Dict[str, Any]
+    count: int = Field(30, ge=1, le=MAX_POOL_TRACKS)
+
+
+class RefineRequest(BaseModel):  # type: ignore[misc]
+    audio_features: Optional[Dict[str, Any]] = None
+    add_genres: Optional[List[str]] = None
+    remove_genres: Optional[List[str]] = None
+    avoid_explicit: Optional[bool] = None
+    count: Optional[int] = Field(None, ge=1, le=MAX_POOL_TRACKS)
 
 
 class CreatePlaylistRequest(BaseModel):  # type: ignore[misc]
@@ -40,29 +88,138 @@ class CreatePlaylistRequest(BaseModel):  # type: ignore[misc]
     tracks: List[Dict[str, Any]]
 
 
+class GeneratePlaylistRequest(BaseModel):  # type: ignore[misc]
+    name: str
+    description: Optional[str] = ""
+    public: bool = True
+    spec: Dict[str, Any]
+    count: int = Field(300, ge=1, le=LARGE_PLAYLIST_MAX_TRACKS)
+
+
 spotify = SpotifyClient()  # type: ignore[call-arg]
 
 
+def resolve_preview_url(track_id: str) -> Optional[str]:
+    # Previews requested before any search registered them (e.g. after a restart)
+    try:
+        track = spotify.sp.track(track_id) if spotify.sp else None
+    except Exception:
+        return None
+    return (track or {}).get('preview_url')
+
+
+previews = PreviewCache(resolve_url=resolve_preview_url)
+sessions = SessionStore()
+
+# Pre-serialized response bodies keyed by request; repeat fetches skip recomputation
+interpret_cache = ResponseCache(max_entries=4096, ttl_seconds=600.0)
+search_cache = ResponseCache(max_entries=1024, ttl_seconds=300.0)
+# Deterministic fallbacks served while the LLM is enabled (breaker open, timeout,
+# invalid output) are cached briefly so repeats still get a 304 without pinning them
+DEGRADED_SPEC_TTL_SECONDS = 30.0
+
+
+def invalidate_interpretations(changed_keywords: Set[str], genres_changed: bool) -> None:
+    # specs depend on the genre map as a whole, but only on the keywords their input matched
+    if genres_changed:
+        interpret_cache.clear()
+    elif changed_keywords:
+        interpret_cache.invalidate(lambda entry: not entry.meta.isdisjoint(changed_keywords))
+
+
+mtp.RELOAD_LISTENERS.append(invalidate_interpretations)
+
+
+def register_previews(tracks: List[Dict[str, Any]]) -> None:
+    """Register previews for the caching proxy and warm the first few"""
+    previews.register(tracks)
+    previews.prefetch([t['id'] for t in tracks[:previews.prefetch_count] if t.get('preview_url')])
+
+
+def with_preview_proxy(tracks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Register previews for the caching proxy and point tracks at it"""
+    register_previews(tracks)
+    for t in tracks:
+        if t.get('preview_url'):
+            t['preview_proxy_url'] = f"/api/preview/{t['id']}"
+    return tracks
+
+
 @app.post("/api/interpret-mood")
-def api_interpret(req: InterpretRequest) -> Dict[str, Any]:  # type: ignore[misc]
-    spec: PlaylistSpec = interpret_mood(
-        emotion_text=req.mood,
-        activity_text=req.activity or "",
-        music_text=req.music or "",
-        user_scores=req.scores or {},
-        explicit_flag=req.avoid_explicit,
-        preferred_genres=req.genres or [],
-    )
-    return spec.model_dump()
+def api_interpret(req: InterpretRequest, request: Request) -> Response:  # type: ignore[misc]
+    key = request_key("interpret-mood", req.model_dump())
+    entry = interpret_cache.get(key)
+    if entry is None:
+        spec: PlaylistSpec = interpret_mood(
+            emotion_text=req.mood,
+            activity_text=req.activity or "",
+            music_text=req.music or "",
+            user_scores=req.scores or {},
+            explicit_flag=req.avoid_explicit,
+            preferred_genres=req.genres or [],
+        )
+        # tokens the spec could depend on, for invalidation when keywords are reloaded
+        words = [w for text in (req.mood, req.activity, req.music) for w in mtp.preprocess_text(text)[1]]
+        degraded = bool(spec.metadata.fallback_used and mtp.USE_LLM)
+        entry = interpret_cache.put(
+            key,
+            dumps(spec.model_dump()),
+            meta=frozenset(mtp.tokens_from_words(words)),
+            ttl_seconds=DEGRADED_SPEC_TTL_SECONDS if degraded else None,
+        )
+    return json_response(request, entry)
 
 
 @app.post("/api/search-tracks")
-def api_search(req: SearchRequest) -> Dict[str, Any]:  # type: ignore[misc]
+def api_search(req: SearchRequest, request: Request) -> Response:  # type: ignore[misc]
+    key = request_key("search-tracks", req.model_dump())
+    entry = search_cache.get(key)
+    if entry is None:
+        try:
+            tracks = with_preview_proxy(spotify.search_tracks(playlist_spec=req.spec, target_count=req.count))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        body = dumps({"tracks": tracks, "count": len(tracks)})
+        if not tracks:
+            # don't pin an upstream hiccup in the cache
+            return Response(content=body, media_type="application/json")
+        # keep just what the preview registry needs, so hits don't re-parse the body
+        entry = search_cache.put(key, body, meta=[
+            {'id': t['id'], 'preview_url': t['preview_url']} for t in tracks if t.get('preview_url')
+        ])
+    else:
+        # the preview registry is bounded; re-register so the proxy URLs in the cached body keep resolving
+        register_previews(entry.meta)
+    return json_response(request, entry)
+
+
+@app.post("/api/refine/sessions")
+def api_refine_start(req: RefineSessionRequest) -> Dict[str, Any]:  # type: ignore[misc]
     try:
-        tracks = spotify.search_tracks(playlist_spec=req.spec, target_count=req.count)
-        return {"tracks": tracks, "count": len(tracks)}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        spec = PlaylistSpec(**req.spec).model_dump()
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    session = RefinementSession(spec=spec, count=req.count, pool=[])
+    with session.lock:
+        tracks, fetched = select_tracks(session, spotify, spec, req.count)
+    sessions.add(session)
+    return {"session_id": session.id, "spec": spec, "tracks": with_preview_proxy(tracks),
+            "count": len(tracks), "fetched_upstream": fetched}
+
+
+@app.post("/api/refine/{session_id}")
+def api_refine(session_id: str, req: RefineRequest) -> Dict[str, Any]:  # type: ignore[misc]
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired refinement session")
+    with session.lock:
+        try:
+            spec = apply_delta(session.spec, req.model_dump(exclude_none=True))
+        except (ValidationError, ValueError, TypeError) as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        tracks, fetched = select_tracks(session, spotify, spec, req.count or session.count)
+    return {"session_id": session.id, "spec": spec, "tracks": with_preview_proxy(tracks),
+            "count": len(tracks), "fetched_upstream": fetched}
 
 
 @app.post("/api/create-playlist")
@@ -83,8 +240,46 @@ def api_create_playlist(req: CreatePlaylistRequest) -> Dict[str, Any]:  # type:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/generate-playlist")
+def api_generate_playlist(req: GeneratePlaylistRequest) -> Dict[str, Any]:  # type: ignore[misc]
+    """Large playlists: search batches are added to the playlist as they fill"""
+    try:
+        playlist = spotify.create_playlist_from_batches(
+            name=req.name,
+            description=req.description or "",
+            batches=spotify.iter_large_playlist(req.spec, req.count),
+            public=req.public,
+        )
+        if not playlist:
+            raise HTTPException(status_code=502, detail="Failed to create playlist")
+        return playlist
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/preview/{track_id}")
+def api_preview(track_id: str) -> FileResponse:  # type: ignore[misc]
+    try:
+        path = previews.get_path(track_id)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Preview fetch failed: {e}")
+    if not path:
+        raise HTTPException(status_code=404, detail="Unknown preview")
+    # FileResponse answers Range requests and uses sendfile where the server supports it
+    return FileResponse(path, media_type="audio/mpeg", headers={"Cache-Control": "public, max-age=86400"})
+
+
 @app.get("/api/health")
 def api_health() -> Dict[str, Any]:  # type: ignore[misc]
     return {"status": "ok"}
 
 
+@app.get("/api/metrics")
+def api_metrics() -> Dict[str, Any]:  # type: ignore[misc]
+    return {"llm_breaker": LLM_BREAKER.snapshot(), "preview_cache": previews.stats(),
+            "refine_sessions": len(sessions),
+            "seed_genres": spotify.seed_genres.snapshot()}
+
+
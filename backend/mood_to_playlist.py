@@ -10,12 +10,15 @@ Return:
 """
 
 from __future__ import annotations
+import csv
+import hashlib
 import json
 import re
+import threading
 import time
 import uuid
 import html
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Callable, Dict, Any, FrozenSet, List, Optional, Set, Tuple
 from dataclasses import dataclass
 from math import floor
 
@@ -23,6 +26,11 @@ from math import floor
 # pip install pydantic openai
 from pydantic import BaseModel, Field, field_validator, ValidationError
 
+from .util.batcher import MicroBatcher
+from .util.cache import BoundedCache
+from .util.circuit_breaker import CircuitBreaker
+from .util.spec_table import SpecTable, SpecTableEntry
+
 # OPTIONAL: uncomment if you'll call OpenAI
 import openai
 import os
@@ -37,6 +45,25 @@ LLM_MODEL = "gpt-4o-mini"  # or gpt-4o, adjust as needed
 LLM_TEMP = 0.2
 LLM_TIMEOUT_SECONDS = 5.0
 LLM_MAX_RETRIES = 1
+# Circuit breaker: skip the LLM entirely while the provider is degraded
+LLM_BREAKER_WINDOW = 50           # rolling window of recent calls
+LLM_BREAKER_MIN_SAMPLES = 10      # calls needed before the breaker may trip
+LLM_BREAKER_MAX_ERROR_RATE = 0.5
+LLM_BREAKER_MAX_P95_MS = 3000.0
+LLM_BREAKER_COOLDOWN_SECONDS = 30.0  # time OPEN before a half-open probe
+LLM_MIN_TIMEOUT_SECONDS = 1.0     # floor for the adaptive timeout
+# Micro-batching: coalesce concurrent interpretations into one LLM request
+USE_LLM_BATCHING = False  # set True under heavy load to share SYSTEM_PROMPT tokens
+LLM_BATCH_MAX_SIZE = 8
+LLM_BATCH_MAX_WAIT_MS = 10.0  # bounded extra latency per request
+LLM_BATCH_MAX_IN_FLIGHT = 8   # batches sent concurrently (x LLM_BATCH_MAX_SIZE prompts per round trip)
+LLM_BATCH_TIMEOUT_PER_ITEM = 0.5  # extra single-call timeouts allowed per additional batched item
+# Keyword data files and the precomputed spec table built from them
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+KEYWORD_CSV_PATH = os.path.join(DATA_DIR, "keyword_to_feature.csv")
+GENRE_CSV_PATH = os.path.join(DATA_DIR, "genre_normalization.csv")
+RESOLVE_CACHE_SIZE = 4096  # merged keyword combinations kept in-process
+SPEC_TABLE_PATH = os.getenv("VIBECHEF_SPEC_TABLE", os.path.join(DATA_DIR, "spec_table.bin"))
 FALLBACK_CONFIDENCE_PENALTY = 0.15
 CONFIDENCE_THRESHOLD = 0.60
 
@@ -101,6 +128,45 @@ SAMPLE_KEYWORD_MAP = {
     },
 }
 
+# CSV priority -> keyword weight
+PRIORITY_WEIGHTS = {"high": 1.0, "medium": 0.7, "low": 0.4}
+
+def load_keyword_csv(path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Reads keyword_to_feature.csv (keyword,feature_type,feature,min_value,max_value,priority)
+    into SAMPLE_KEYWORD_MAP-shaped entries. The first row wins for a repeated
+    keyword/feature; the entry weight is its highest row priority.
+    """
+    keyword_map: Dict[str, Dict[str, Any]] = {}
+    try:
+        fh = open(path, newline="", encoding="utf-8")
+    except OSError:
+        return keyword_map
+    with fh:
+        rows = csv.reader(line for line in fh if line.strip() and not line.startswith("#"))
+        for row in rows:
+            if len(row) < 6 or row[0] == "keyword":
+                continue
+            keyword, _, feature, lo, hi, priority = (c.strip() for c in row[:6])
+            try:
+                rng = (int(float(lo)), int(float(hi))) if feature == "tempo_bpm" else (float(lo), float(hi))
+            except ValueError:
+                continue
+            entry = keyword_map.setdefault(keyword.lower(), {
+                "genres": [],
+                "descriptors": [keyword.lower()],
+                "audio_features": {},
+                "weight": 0.0,
+            })
+            entry["audio_features"].setdefault(feature, list(rng))
+            entry["weight"] = max(entry["weight"], PRIORITY_WEIGHTS.get(priority.lower(), 0.4))
+    return keyword_map
+
+def keyword_map_digest(keyword_map: Dict[str, Dict[str, Any]]) -> bytes:
+    """Identifies the keyword data a precomputed spec table was built from."""
+    payload = json.dumps([SCHEMA_VERSION, keyword_map], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).digest()
+
 # Very small genre normalization map starter (expand outside)
 GENRE_NORMALIZATION = {
     "hiphop": "hip-hop",
@@ -112,6 +178,94 @@ GENRE_NORMALIZATION = {
     "edm": "electronic",
 }
 
+def load_genre_csv(path: str) -> Dict[str, str]:
+    """Reads genre_normalization.csv (input_genre,normalized_genre)."""
+    genre_map: Dict[str, str] = {}
+    try:
+        fh = open(path, newline="", encoding="utf-8")
+    except OSError:
+        return genre_map
+    with fh:
+        rows = csv.reader(line for line in fh if line.strip() and not line.startswith("#"))
+        for row in rows:
+            if len(row) < 2 or row[0] == "input_genre":
+                continue
+            genre_map[row[0].strip().lower()] = row[1].strip().lower()
+    return genre_map
+
+# --------------------------
+# COMPILED KEYWORD INDEX (hot-reloadable)
+# --------------------------
+class KeywordIndex:
+    """
+    Immutable snapshot of everything derived from the keyword/genre data files.
+
+    Readers grab KEYWORD_INDEX once and use that snapshot for the whole
+    request; reload_keyword_index() builds a new snapshot and swaps the
+    module reference, so the read path never takes a lock.
+    """
+
+    __slots__ = ("keyword_map", "genre_normalization", "spec_table", "table_stale", "resolve_cache")
+
+    def __init__(
+        self,
+        keyword_map: Dict[str, Dict[str, Any]],
+        genre_normalization: Dict[str, str],
+        spec_table: Optional[SpecTable],
+        table_stale: FrozenSet[str],
+        resolve_cache: BoundedCache,
+    ) -> None:
+        self.keyword_map = keyword_map
+        self.genre_normalization = genre_normalization
+        # precomputed table, minus entries involving keywords changed since it was built
+        self.spec_table = spec_table
+        self.table_stale = table_stale
+        self.resolve_cache = resolve_cache
+
+def changed_keywords(old: Dict[str, Dict[str, Any]], new: Dict[str, Dict[str, Any]]) -> Set[str]:
+    return {k for k in old.keys() | new.keys() if old.get(k) != new.get(k)}
+
+def build_keyword_index(previous: Optional[KeywordIndex] = None) -> KeywordIndex:
+    # Hand-written entries above take precedence over CSV rows (they carry genres)
+    keyword_map = {**load_keyword_csv(KEYWORD_CSV_PATH), **SAMPLE_KEYWORD_MAP}
+    genre_normalization = {**load_genre_csv(GENRE_CSV_PATH), **GENRE_NORMALIZATION}
+    if previous is None:
+        # Only trust a table built from the keyword data currently loaded
+        spec_table = SpecTable.open(SPEC_TABLE_PATH, expected_digest=keyword_map_digest(keyword_map))
+        return KeywordIndex(keyword_map, genre_normalization, spec_table, frozenset(), BoundedCache(RESOLVE_CACHE_SIZE))
+    # copy-on-write: carry over cached merges that don't involve a changed keyword
+    changed = changed_keywords(previous.keyword_map, keyword_map)
+    resolve_cache = previous.resolve_cache.copy(exclude=lambda key: any(k in changed for k in key))
+    return KeywordIndex(
+        keyword_map,
+        genre_normalization,
+        previous.spec_table,
+        previous.table_stale | frozenset(changed),
+        resolve_cache,
+    )
+
+# The spec table (if built) is memory-mapped here; workers share it via the page cache
+KEYWORD_INDEX = build_keyword_index()
+_RELOAD_LOCK = threading.Lock()  # serializes writers only
+
+# Called as listener(changed_keywords, genres_changed) after every reload that changed
+# something (e.g. to drop cached responses built from the old maps)
+RELOAD_LISTENERS: List[Callable[[Set[str], bool], None]] = []
+
+def reload_keyword_index() -> Set[str]:
+    """Re-reads the data files and swaps in a new index. Returns the changed keywords."""
+    global KEYWORD_INDEX
+    with _RELOAD_LOCK:
+        previous = KEYWORD_INDEX
+        index = build_keyword_index(previous)
+        KEYWORD_INDEX = index
+    changed = changed_keywords(previous.keyword_map, index.keyword_map)
+    genres_changed = previous.genre_normalization != index.genre_normalization
+    if changed or genres_changed:
+        for listener in RELOAD_LISTENERS:
+            listener(changed, genres_changed)
+    return changed
+
 # --------------------------
 # SCHEMA USING Pydantic
 # --------------------------
@@ -168,17 +322,53 @@ class PlaylistSpec(BaseModel):
 # --------------------------
 # UTIL: Sanitization helpers
 # --------------------------
-def sanitize_text(s: str) -> str:
-    if s is None:
-        return ""
-    s = s.strip()
-    s = re.sub(r"\s+", " ", s)
+# Preprocessing bounds: raw input past MAX_SCAN_CHARS is never looked at, and every
+# pattern below is linear, so sanitizing costs O(MAX_SCAN_CHARS) per field.
+MAX_SANITIZED_CHARS = 500
+MAX_SCAN_CHARS = 4 * MAX_SANITIZED_CHARS
+# The lookbehind pins matches to the start of a run, so no start position is rescanned
+EMAIL_RE = re.compile(r"(?<![\w.\-])[\w.\-]+@[\w\-]+(?:\.[\w\-]+)+")
+# A maximal digit/separator run starting on a digit at a word boundary. It always
+# matches without backtracking; _redact_phone trims it to end on a digit at a word
+# boundary, which is what r"\b(\+?\d[\d\-\s]{6,}\d)\b" matched.
+PHONE_RUN_RE = re.compile(r"(?<!\w)\d[\d\-\s]*")
+WORD_CHAR_RE = re.compile(r"\w")
+PII_MARKER_RE = re.compile(r"<REDACTED_(?:EMAIL|PHONE)>")
+WORD_RE = re.compile(r"[a-z0-9]+")
+MIN_PHONE_CHARS = 8  # first to last digit, as in 555-1234
+
+def _redact_phone(m: "re.Match[str]") -> str:
+    run, end = m.group(), m.end()
+    keep = len(run)
+    if WORD_CHAR_RE.match(m.string, end):
+        # digits glued to a following letter don't end on a word boundary
+        while keep and run[keep - 1].isdecimal():
+            keep -= 1
+    while keep and not run[keep - 1].isdecimal():
+        keep -= 1
+    if keep < MIN_PHONE_CHARS:
+        return run
+    return "<REDACTED_PHONE>" + run[keep:]
+
+def redact_pii(s: str) -> str:
     # Remove obvious PII forms (email, phone) - redact
-    s = re.sub(r"\b[\w\.-]+@[\w\.-]+\.\w+\b", "<REDACTED_EMAIL>", s)
-    s = re.sub(r"\b(\+?\d[\d\-\s]{6,}\d)\b", "<REDACTED_PHONE>", s)
+    s = EMAIL_RE.sub("<REDACTED_EMAIL>", s)
+    return PHONE_RUN_RE.sub(_redact_phone, s)
+
+def preprocess_text(s: Optional[str]) -> Tuple[str, List[str]]:
+    """
+    Bounded-cost input preprocessing. Returns (sanitized snippet for the LLM
+    prompt, lowercase words for the keyword index; PII and markup excluded).
+    """
+    if not s:
+        return "", []
+    text = redact_pii(" ".join(s[:MAX_SCAN_CHARS].split()))
+    words = WORD_RE.findall(PII_MARKER_RE.sub(" ", text)[:MAX_SANITIZED_CHARS].lower())
     # escape HTML to avoid display issues
-    s = html.escape(s)
-    return s[:500]  # hard cap
+    return html.escape(text)[:MAX_SANITIZED_CHARS], words
+
+def sanitize_text(s: str) -> str:
+    return preprocess_text(s)[0]
 
 def snippet(s: str, length=80) -> str:
     return (s[:length] + "...") if len(s) > length else s
@@ -190,7 +380,7 @@ def normalize_genre(g: str) -> str:
     if not g:
         return ""
     key = g.lower().strip()
-    return GENRE_NORMALIZATION.get(key, key)
+    return KEYWORD_INDEX.genre_normalization.get(key, key)
 
 # --------------------------
 # UTIL: simple tokenizer for fallback
@@ -200,9 +390,10 @@ STOPWORDS = set([
 ])
 
 def tokenize(text: str) -> List[str]:
-    text = text.lower()
     # simple split and preserve 2-grams
-    words = re.findall(r"[a-z0-9]+", text)
+    return tokens_from_words(WORD_RE.findall(text.lower()))
+
+def tokens_from_words(words: List[str]) -> List[str]:
     tokens = []
     for i, w in enumerate(words):
         if w in STOPWORDS:
@@ -218,6 +409,74 @@ def tokenize(text: str) -> List[str]:
 # --------------------------
 # FALLBACK: deterministic specification builder
 # --------------------------
+def merge_feature(acc_list, default_range, is_tempo=False):
+    """Weighted average of range midpoints, widened to a window around it."""
+    if not acc_list:
+        return default_range
+    total_w = 0.0
+    weighted_mid = 0.0
+    for v, w in acc_list:
+        # v is either [min,max] or a single value; assume range
+        mn, mx = v
+        mid = (mn + mx) / 2.0
+        weighted_mid += mid * w
+        total_w += w
+    mid = weighted_mid / total_w if total_w > 0 else (default_range[0] + default_range[1]) / 2.0
+    # produce a +-20% window around mid, clamped
+    if is_tempo:
+        lo = max(MIN_TEMPO, int(mid * 0.85))
+        hi = min(MAX_TEMPO, int(mid * 1.15))
+        return (lo, hi)
+    else:
+        lo = max(MIN_FLOAT, mid - 0.15)
+        hi = min(MAX_FLOAT, mid + 0.15)
+        if lo > hi:
+            lo, hi = hi, lo
+        return (round(lo, 3), round(hi, 3))
+
+def merge_keyword_entries(matched: List[str], keyword_map: Optional[Dict[str, Dict[str, Any]]] = None) -> SpecTableEntry:
+    """
+    Aggregates the map entries of matched keywords (in token order) into
+    (genres, descriptors, audio_features). Only features some keyword set are
+    returned; the caller fills the rest with defaults.
+    """
+    keyword_map = KEYWORD_INDEX.keyword_map if keyword_map is None else keyword_map
+    collected_genres: List[str] = []
+    collected_descriptors: List[str] = []
+    feature_accumulators: Dict[str, List[Any]] = {}
+    for t in matched:
+        entry = keyword_map[t]
+        w = entry.get("weight", 1.0)
+        collected_genres.extend(entry.get("genres", []))
+        collected_descriptors.extend(entry.get("descriptors", []))
+        af = entry.get("audio_features", {})
+        for k, v in af.items():
+            feature_accumulators.setdefault(k, []).append((v, w))
+    merged = {
+        k: merge_feature(acc, None, is_tempo=(k == "tempo_bpm"))
+        for k, acc in feature_accumulators.items()
+    }
+    return collected_genres, collected_descriptors, merged
+
+def resolve_keywords(matched: List[str], index: Optional[KeywordIndex] = None) -> SpecTableEntry:
+    """Precomputed table, then in-process cache, then a fresh merge."""
+    index = KEYWORD_INDEX if index is None else index
+    key = tuple(matched)
+    if (
+        index.spec_table is not None
+        and 0 < len(key) <= 2
+        and not any(k in index.table_stale for k in key)
+    ):
+        hit = index.spec_table.lookup(key)
+        if hit is not None:
+            return hit
+    cached = index.resolve_cache.get(key)
+    if cached is not None:
+        return cached
+    entry = merge_keyword_entries(matched, index.keyword_map)
+    index.resolve_cache.put(key, entry)
+    return entry
+
 def build_spec_from_keywords(
     tokens: List[str],
     explicit_flag: bool,
@@ -225,28 +484,9 @@ def build_spec_from_keywords(
     user_scores: Dict[str, Any]
 ) -> PlaylistSpec:
     # aggregate weights and ranges
-    collected_genres = []
-    collected_descriptors = []
-    feature_accumulators = {
-        "energy": [],
-        "valence": [],
-        "danceability": [],
-        "acousticness": [],
-        "instrumentalness": [],
-        "tempo_bpm": [],
-    }
-    weights = []
-
-    for t in tokens:
-        if t in SAMPLE_KEYWORD_MAP:
-            entry = SAMPLE_KEYWORD_MAP[t]
-            w = entry.get("weight", 1.0)
-            weights.append(w)
-            collected_genres.extend(entry.get("genres", []))
-            collected_descriptors.extend(entry.get("descriptors", []))
-            af = entry.get("audio_features", {})
-            for k, v in af.items():
-                feature_accumulators.setdefault(k, []).append((v, w))
+    index = KEYWORD_INDEX
+    matched = [t for t in tokens if t in index.keyword_map]
+    collected_genres, collected_descriptors, merged_features = resolve_keywords(matched, index)
 
     # If user provided preferred genres, put them first
     final_genres = []
@@ -264,31 +504,6 @@ def build_spec_from_keywords(
     if not final_genres_unique:
         final_genres_unique = ["indie", "pop"]  # safe defaults
 
-    # merge features (weighted average of midpoints)
-    def merge_feature(acc_list, default_range, is_tempo=False):
-        if not acc_list:
-            return default_range
-        total_w = 0.0
-        weighted_mid = 0.0
-        for v, w in acc_list:
-            # v is either [min,max] or a single value; assume range
-            mn, mx = v
-            mid = (mn + mx) / 2.0
-            weighted_mid += mid * w
-            total_w += w
-        mid = weighted_mid / total_w if total_w > 0 else (default_range[0] + default_range[1]) / 2.0
-        # produce a +-20% window around mid, clamped
-        if is_tempo:
-            lo = max(MIN_TEMPO, int(mid * 0.85))
-            hi = min(MAX_TEMPO, int(mid * 1.15))
-            return (lo, hi)
-        else:
-            lo = max(MIN_FLOAT, mid - 0.15)
-            hi = min(MAX_FLOAT, mid + 0.15)
-            if lo > hi:
-                lo, hi = hi, lo
-            return (round(lo, 3), round(hi, 3))
-
     # defaults for different moods (neutral)
     default_audio = {
         "energy": (0.4, 0.6),
@@ -300,9 +515,8 @@ def build_spec_from_keywords(
     }
 
     audio_features = {}
-    for k in feature_accumulators.keys():
-        acc = feature_accumulators.get(k, [])
-        audio_features[k] = merge_feature(acc, default_audio[k], is_tempo=(k == "tempo_bpm"))
+    for k in default_audio.keys():
+        audio_features[k] = merged_features.get(k, default_audio[k])
 
     # Merge user numeric scores if provided (they override or nudge)
     # Expect user_scores keys: energy, valence, danceability, instrumentalness, tempo_bpm
@@ -388,9 +602,8 @@ def build_spec_from_keywords(
 # --------------------------
 # LLM PROMPT BUILDERS
 # --------------------------
-SYSTEM_PROMPT = """
-You are a Music-Curation Assistant. Given user inputs (emotion, activity, music description, numeric scores, explicit flag, and preferred genres),
-return EXACTLY ONE JSON object that matches schema version 1.0.0. DO NOT return any prose or explanation.
+# Shared by the single and batch prompts so the two can't drift apart
+SCHEMA_RULES = """
 Schema rules:
 - genres: 1-5 normalized genres (lowercase).
 - mood_descriptors: 1-6 short words.
@@ -401,6 +614,22 @@ Clamp out-of-range numeric values and describe the clamp in processing_notes.
 Return only JSON.
 """.strip()
 
+SYSTEM_PROMPT = f"""
+You are a Music-Curation Assistant. Given user inputs (emotion, activity, music description, numeric scores, explicit flag, and preferred genres),
+return EXACTLY ONE JSON object that matches schema version {SCHEMA_VERSION}. DO NOT return any prose or explanation.
+{SCHEMA_RULES}
+""".strip()
+
+BATCH_SYSTEM_PROMPT = f"""
+You are a Music-Curation Assistant. You will receive a JSON object whose "requests" field is an array of user inputs
+(emotion, activity, music description, numeric scores, explicit flag, and preferred genres).
+Return EXACTLY ONE JSON array with one object per request, in the same order, each matching schema version {SCHEMA_VERSION}.
+DO NOT return any prose or explanation.
+{SCHEMA_RULES}
+""".strip()
+# Wrapper objects some models put around the batch array
+BATCH_WRAPPER_KEYS = ("specs", "playlist_specs", "results", "responses")
+
 FEW_SHOT_EXAMPLE = None  # optional: keep small or omitted to reduce tokens
 
 def build_user_prompt(
@@ -422,6 +651,19 @@ def build_user_prompt(
         "instructions": "Return a single JSON PlaylistSpec per schema version 1.0.0. No commentary."
     }, ensure_ascii=False)
 
+def build_batch_user_prompt(user_prompts: List[str]) -> str:
+    # re-wrap the individual build_user_prompt payloads into one request
+    requests = []
+    for p in user_prompts:
+        payload = json.loads(p)
+        payload.pop("instructions", None)
+        requests.append(payload)
+    return json.dumps({
+        "requests": requests,
+        "instructions": f"Return a JSON array of exactly {len(requests)} PlaylistSpec objects "
+                        "per schema version 1.0.0, in request order. No commentary."
+    }, ensure_ascii=False)
+
 # --------------------------
 # INTERPRETATION CONFIDENCE CALCULATOR
 # --------------------------
@@ -463,13 +705,28 @@ def compute_confidence_from_response(parsed_json: Dict[str, Any], llm_used: bool
 # --------------------------
 # LLM CALL (wrapper)
 # --------------------------
-def call_llm(prompt_system: str, prompt_user: str) -> Tuple[Optional[Dict[str, Any]], Optional[str], float]:
+LLM_BREAKER = CircuitBreaker(
+    window=LLM_BREAKER_WINDOW,
+    min_samples=LLM_BREAKER_MIN_SAMPLES,
+    max_error_rate=LLM_BREAKER_MAX_ERROR_RATE,
+    max_p95_ms=LLM_BREAKER_MAX_P95_MS,
+    cooldown_seconds=LLM_BREAKER_COOLDOWN_SECONDS,
+    max_timeout_seconds=LLM_TIMEOUT_SECONDS,
+    min_timeout_seconds=LLM_MIN_TIMEOUT_SECONDS,
+)
+
+def call_llm(
+    prompt_system: str,
+    prompt_user: str,
+    timeout: Optional[float] = None,
+) -> Tuple[Optional[Dict[str, Any]], Optional[str], float]:
     """
     Calls the LLM and returns (parsed_json_or_none, raw_text_or_none, latency_ms).
-    Retries once if parse failure.
+    Retries once if parse failure. `timeout` defaults to LLM_TIMEOUT_SECONDS.
     """
     if not USE_LLM:
         return None, None, 0.0
+    timeout = LLM_TIMEOUT_SECONDS if timeout is None else timeout
 
     # The actual implementation depends on your OpenAI client.
     # Example with ChatCompletions (pseudo):
@@ -483,7 +740,7 @@ def call_llm(prompt_system: str, prompt_user: str) -> Tuple[Optional[Dict[str, A
     #                                         messages=messages,
     #                                         temperature=LLM_TEMP,
     #                                         max_tokens=600,
-    #                                         timeout=LLM_TIMEOUT_SECONDS)
+    #                                         timeout=timeout)
     #     text = resp.choices[0].message.content
     # except Exception as e:
     #     return None, None, (time.time()-start)*1000
@@ -496,6 +753,67 @@ def call_llm(prompt_system: str, prompt_user: str) -> Tuple[Optional[Dict[str, A
     #     # retry once with stricter settings (not implemented here)
     return None, None, 0.0
 
+def guarded_call_llm(
+    prompt_system: str,
+    prompt_user: str,
+    timeout: float,
+) -> Tuple[Optional[Dict[str, Any]], float]:
+    """
+    call_llm that never raises: an exception counts as a failed call taking
+    the elapsed time. Callers always get to LLM_BREAKER.record(), so a
+    half-open probe is never left in flight.
+    """
+    started = time.monotonic()
+    try:
+        parsed, _, latency = call_llm(prompt_system, prompt_user, timeout=timeout)
+        return parsed, latency
+    except Exception as e:
+        print(f"❌ LLM call failed: {e}")
+        return None, (time.monotonic() - started) * 1000.0
+
+def llm_batch_scale(size: int) -> float:
+    """How many single calls' worth of latency a batch of `size` prompts may take."""
+    return 1.0 + LLM_BATCH_TIMEOUT_PER_ITEM * max(0, size - 1)
+
+def send_llm_batch(user_prompts: List[str]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Sends several build_user_prompt payloads as one LLM request and splits the
+    returned JSON array back into per-request results (None where missing or
+    malformed, so each item can fall back independently).
+    """
+    if len(user_prompts) == 1:
+        parsed, latency = guarded_call_llm(
+            SYSTEM_PROMPT, user_prompts[0], timeout=LLM_BREAKER.effective_timeout()
+        )
+        LLM_BREAKER.record(latency, ok=parsed is not None)
+        return [parsed]
+
+    # the breaker window holds single-call latencies: scale the timeout up for
+    # the batch and record its latency back in single-call units
+    scale = llm_batch_scale(len(user_prompts))
+    parsed, latency = guarded_call_llm(
+        BATCH_SYSTEM_PROMPT,
+        build_batch_user_prompt(user_prompts),
+        timeout=LLM_BREAKER.effective_timeout() * scale,
+    )
+    if isinstance(parsed, dict):
+        # tolerate {"specs": [...]} style wrappers, but never a lone spec's own list fields
+        parsed = next((parsed[k] for k in BATCH_WRAPPER_KEYS if isinstance(parsed.get(k), list)), None)
+    # results are matched to prompts by position, so a short or long array can't be trusted
+    ok = isinstance(parsed, list) and len(parsed) == len(user_prompts)
+    LLM_BREAKER.record(latency / scale, ok=ok)
+    if not ok:
+        return [None] * len(user_prompts)
+    return [item if isinstance(item, dict) else None for item in parsed]
+
+LLM_BATCHER = MicroBatcher(
+    send_llm_batch,
+    max_batch_size=LLM_BATCH_MAX_SIZE,
+    max_wait_ms=LLM_BATCH_MAX_WAIT_MS,
+    name="llm-batcher",
+    max_in_flight=LLM_BATCH_MAX_IN_FLIGHT,
+)
+
 def interpret_mood(
     emotion_text: str,
     activity_text: str,
@@ -518,10 +836,10 @@ def interpret_mood(
     Returns:
         PlaylistSpec: Validated playlist specification
     """
-    # Sanitize inputs
-    emotion_clean = sanitize_text(emotion_text)
-    activity_clean = sanitize_text(activity_text)
-    music_clean = sanitize_text(music_text)
+    # Sanitize inputs; the same bounded pass yields the words for the keyword index
+    emotion_clean, emotion_words = preprocess_text(emotion_text)
+    activity_clean, activity_words = preprocess_text(activity_text)
+    music_clean, music_words = preprocess_text(music_text)
 
     # Combine all text for processing
     combined_text = f"{emotion_clean} {activity_clean} {music_clean}".strip()
@@ -535,8 +853,8 @@ def interpret_mood(
             user_scores=user_scores or {}
         )
 
-    # Try LLM first if enabled
-    if USE_LLM:
+    # Try LLM first if enabled and the circuit breaker lets us through
+    if USE_LLM and LLM_BREAKER.allow_request():
         prompt_user = build_user_prompt(
             emotion_text=emotion_clean,
             activity_text=activity_clean,
@@ -546,7 +864,22 @@ def interpret_mood(
             preferred_genres=preferred_genres
         )
 
-        parsed_json, raw_text, latency = call_llm(SYSTEM_PROMPT, prompt_user)
+        if USE_LLM_BATCHING:
+            future = LLM_BATCHER.submit(prompt_user)
+            try:
+                parsed_json = future.result(
+                    timeout=LLM_BATCH_MAX_WAIT_MS / 1000.0
+                    + LLM_BREAKER.effective_timeout() * llm_batch_scale(LLM_BATCH_MAX_SIZE)
+                )
+            except Exception:
+                # gave up waiting: the batcher drops the prompt if it hasn't gone out yet
+                future.cancel()
+                parsed_json = None
+        else:
+            parsed_json, latency = guarded_call_llm(
+                SYSTEM_PROMPT, prompt_user, timeout=LLM_BREAKER.effective_timeout()
+            )
+            LLM_BREAKER.record(latency, ok=parsed_json is not None)
 
         if parsed_json:
             # Validate and return LLM result
@@ -557,12 +890,12 @@ def interpret_mood(
 
                 spec = PlaylistSpec(**parsed_json)
                 return spec
-            except ValidationError as e:
+            except (ValidationError, KeyError, TypeError) as e:
                 # LLM result invalid, fall through to fallback
                 pass
 
     # Fallback to deterministic processing
-    tokens = tokenize(combined_text)
+    tokens = tokens_from_words(emotion_words + activity_words + music_words)
     spec = build_spec_from_keywords(
         tokens=tokens,
         explicit_flag=explicit_flag,
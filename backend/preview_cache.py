@@ -0,0 +1,220 @@
+from __future__ import annotations
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests  # type: ignore
+
+from .util.cache import BoundedCache
+
+PREVIEW_CACHE_DIR = os.getenv("VIBECHEF_PREVIEW_CACHE_DIR", os.path.join(tempfile.gettempdir(), "vibechef-previews"))
+PREVIEW_CACHE_MAX_BYTES = int(os.getenv("VIBECHEF_PREVIEW_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+PREVIEW_PREFETCH_COUNT = 3       # previews warmed ahead of the one being played
+PREVIEW_FETCH_TIMEOUT_SECONDS = 10.0
+PREVIEW_REGISTRY_SIZE = 50000    # track_id -> upstream URL entries kept in memory
+PREVIEW_NEGATIVE_CACHE_SIZE = 50000  # ids the resolver found no preview for
+PREVIEW_NEGATIVE_TTL_SECONDS = 60 * 60
+
+# Spotify IDs are base62; anything else never touches the filesystem
+TRACK_ID_RE = re.compile(r"^[A-Za-z0-9]{1,64}$")
+
+
+class PreviewCache:
+    """
+    Size-bounded on-disk LRU of preview clips, keyed by track id.
+
+    search results register each track's upstream preview URL together with
+    the ids that follow it in the playlist; fetching one preview warms the
+    next `prefetch_count` in the background. Files are served by the caller
+    (FileResponse), which handles Range requests and sendfile.
+    """
+
+    def __init__(
+        self,
+        root: str = PREVIEW_CACHE_DIR,
+        max_bytes: int = PREVIEW_CACHE_MAX_BYTES,
+        prefetch_count: int = PREVIEW_PREFETCH_COUNT,
+        resolve_url: Optional[Callable[[str], Optional[str]]] = None,
+    ) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.prefetch_count = prefetch_count
+        self.resolve_url = resolve_url
+        # track_id -> (upstream url, ids following it in its playlist)
+        self._registry = BoundedCache(PREVIEW_REGISTRY_SIZE)
+        # track_id -> time the resolver came back empty; kept apart so a flood of
+        # unknown ids can't evict registered ones
+        self._no_preview = BoundedCache(PREVIEW_NEGATIVE_CACHE_SIZE)
+        self._lru: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, threading.Lock] = {}
+        self._prefetcher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="preview-prefetch")
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.root, exist_ok=True)
+        self._scan()
+
+    # --------------------------
+    # Registry / prefetch
+    # --------------------------
+    def register(self, tracks: List[Dict[str, Any]]) -> None:
+        """Remember preview URLs (and playlist order) from a search result."""
+        ids = [t.get('id') for t in tracks if t.get('id') and t.get('preview_url')]
+        urls = {t['id']: t['preview_url'] for t in tracks if t.get('id') and t.get('preview_url')}
+        for i, track_id in enumerate(ids):
+            self._registry.put(track_id, (urls[track_id], tuple(ids[i + 1:i + 1 + self.prefetch_count])))
+
+    def prefetch(self, track_ids: List[str]) -> None:
+        for track_id in track_ids:
+            if not self.is_cached(track_id):
+                self._prefetcher.submit(self._fetch_quietly, track_id)
+
+    # --------------------------
+    # Lookup
+    # --------------------------
+    def is_cached(self, track_id: str) -> bool:
+        return track_id in self._lru
+
+    def get_path(self, track_id: str) -> Optional[str]:
+        """
+        Local path of the preview for `track_id`, downloading it on a miss.
+        Returns None for unknown tracks; raises on upstream failure.
+        """
+        if not TRACK_ID_RE.match(track_id):
+            return None
+        entry = self._registry.get(track_id)
+        path = self._fetch(track_id)
+        if path is not None and entry is not None:
+            self.prefetch(list(entry[1]))
+        return path
+
+    # --------------------------
+    # Internals
+    # --------------------------
+    def _path(self, track_id: str) -> str:
+        return os.path.join(self.root, f"{track_id}.mp3")
+
+    def _scan(self) -> None:
+        # rebuild LRU order from mtimes so the cache survives restarts
+        found: List[Tuple[float, str, int]] = []
+        for name in os.listdir(self.root):
+            track_id, ext = os.path.splitext(name)
+            if ext != ".mp3" or not TRACK_ID_RE.match(track_id):
+                continue
+            st = os.stat(os.path.join(self.root, name))
+            found.append((st.st_mtime, track_id, st.st_size))
+        with self._lock:
+            for _, track_id, size in sorted(found):
+                self._lru[track_id] = size
+                self._total_bytes += size
+            self._evict()
+
+    def _touch(self, track_id: str) -> bool:
+        with self._lock:
+            if track_id not in self._lru:
+                return False
+            self._lru.move_to_end(track_id)
+        try:
+            os.utime(self._path(track_id))
+        except OSError:
+            pass
+        return True
+
+    def _upstream_url(self, track_id: str) -> Optional[str]:
+        entry = self._registry.get(track_id)
+        if entry is not None:
+            return entry[0]
+        if self.resolve_url is None:
+            return None
+        checked_at = self._no_preview.get(track_id)
+        if checked_at is not None and time.monotonic() - checked_at < PREVIEW_NEGATIVE_TTL_SECONDS:
+            return None
+        url = self.resolve_url(track_id)
+        if url:
+            self._registry.put(track_id, (url, ()))
+        else:
+            self._no_preview.put(track_id, time.monotonic())
+        return url
+
+    def _fetch(self, track_id: str) -> Optional[str]:
+        if self._touch(track_id):
+            self.hits += 1
+            return self._path(track_id)
+        with self._lock:
+            inflight = self._inflight.setdefault(track_id, threading.Lock())
+        # one download per track; concurrent callers wait for it
+        with inflight:
+            try:
+                if self._touch(track_id):
+                    self.hits += 1
+                    return self._path(track_id)
+                url = self._upstream_url(track_id)
+                if not url:
+                    return None
+                self.misses += 1
+                return self._download(track_id, url)
+            finally:
+                with self._lock:
+                    self._inflight.pop(track_id, None)
+
+    def _fetch_quietly(self, track_id: str) -> None:
+        try:
+            self._fetch(track_id)
+        except Exception as e:
+            print(f"Error prefetching preview {track_id}: {e}")
+
+    def _download(self, track_id: str, url: str) -> str:
+        path = self._path(track_id)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as fh, requests.get(url, stream=True, timeout=PREVIEW_FETCH_TIMEOUT_SECONDS) as resp:
+                resp.raise_for_status()
+                for chunk in resp.iter_content(chunk_size=64 * 1024):
+                    fh.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            # a re-download replaces the file, so only the size difference is new
+            self._total_bytes += size - self._lru.get(track_id, 0)
+            self._lru[track_id] = size
+            self._evict(keep=track_id)
+        return path
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        # caller holds the lock
+        while self._total_bytes > self.max_bytes and self._lru:
+            victim = next(iter(self._lru))
+            if victim == keep:
+                if len(self._lru) == 1:
+                    break
+                self._lru.move_to_end(victim)
+                continue
+            size = self._lru.pop(victim)
+            self._total_bytes -= size
+            try:
+                os.unlink(self._path(victim))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._lru),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,185 @@
+from __future__ import annotations
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .mood_to_playlist import (
+    MAX_FLOAT, MAX_TEMPO, MIN_FLOAT, MIN_TEMPO, PlaylistSpec, normalize_genre,
+)
+
+SESSION_TTL_SECONDS = 15 * 60
+MAX_SESSIONS = 1000
+MAX_POOL_TRACKS = 300          # per session; bounds memory to MAX_SESSIONS * MAX_POOL_TRACKS tracks
+POOL_OVERSAMPLE = 3            # candidates fetched per requested track, so later tweaks can be served locally
+FIT_TOLERANCE = 0.15           # summed normalized out-of-range distance still counted as a fit
+GENRE_MISS_PENALTY = 0.25      # ranking penalty for tracks seeded from none of the spec's genres
+RANKED_FEATURES = ('energy', 'valence', 'danceability', 'acousticness', 'instrumentalness', 'tempo_bpm')
+
+
+class RefinementSession:
+    """Last spec and candidate pool (tracks with audio features) for one user."""
+
+    def __init__(self, spec: Dict[str, Any], count: int, pool: List[Dict[str, Any]]) -> None:
+        self.id = uuid.uuid4().hex
+        self.spec = spec
+        self.count = count
+        self.pool = pool
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+
+class SessionStore:
+    """In-process session map with TTL expiry and LRU eviction past max_sessions."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        max_sessions: int = MAX_SESSIONS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._clock = clock
+        self._sessions: "OrderedDict[str, RefinementSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, session: RefinementSession) -> None:
+        with self._lock:
+            self._expire()
+            session.last_used = self._clock()
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def get(self, session_id: str) -> Optional[RefinementSession]:
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = self._clock()
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def discard(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _expire(self) -> None:
+        # caller holds the lock; LRU order means expired sessions are at the front
+        cutoff = self._clock() - self.ttl_seconds
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_used >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+
+
+# --------------------------
+# Spec deltas
+# --------------------------
+def apply_delta(spec: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns a new validated spec with the delta applied. Delta keys:
+      audio_features: {feature: [lo, hi] or a single target value}
+      add_genres / remove_genres: lists of genre names
+      avoid_explicit: bool
+    """
+    new = copy.deepcopy(spec)
+    for feature, value in (delta.get('audio_features') or {}).items():
+        if feature not in RANKED_FEATURES or value is None:
+            continue
+        if isinstance(value, (list, tuple)) and len(value) == 2:
+            new['audio_features'][feature] = [value[0], value[1]]
+        elif feature == 'tempo_bpm':
+            v = float(value)
+            new['audio_features'][feature] = [max(MIN_TEMPO, int(v * 0.85)), min(MAX_TEMPO, int(v * 1.15))]
+        else:
+            v = float(value)
+            new['audio_features'][feature] = [max(MIN_FLOAT, round(v - 0.15, 3)), min(MAX_FLOAT, round(v + 0.15, 3))]
+
+    removed = {normalize_genre(g) for g in delta.get('remove_genres') or []}
+    added = [normalize_genre(g) for g in delta.get('add_genres') or [] if g]
+    genres = [g for g in added + list(new.get('genres') or []) if g and g not in removed]
+    new['genres'] = list(dict.fromkeys(genres))[:5] or ['pop']
+
+    if delta.get('avoid_explicit') is not None:
+        new.setdefault('constraints', {})['avoid_explicit'] = bool(delta['avoid_explicit'])
+    # clamps/orders ranges exactly like a fresh interpretation would
+    return PlaylistSpec(**new).model_dump()
+
+
+# --------------------------
+# Pool ranking
+# --------------------------
+def track_distance(track: Dict[str, Any], spec: Dict[str, Any]) -> float:
+    """Summed out-of-range distance (features normalized to 0-1), plus a genre penalty."""
+    features = track.get('audio_features') or {}
+    ranges = spec.get('audio_features') or {}
+    distance = 0.0
+    for name in RANKED_FEATURES:
+        value, rng = features.get(name), ranges.get(name)
+        if value is None or not rng:
+            continue
+        lo, hi = float(rng[0]), float(rng[1])
+        scale = float(MAX_TEMPO - MIN_TEMPO) if name == 'tempo_bpm' else 1.0
+        if value < lo:
+            distance += (lo - value) / scale
+        elif value > hi:
+            distance += (value - hi) / scale
+    if not set(track.get('seed_genres') or ()) & set(spec.get('genres') or ()):
+        distance += GENRE_MISS_PENALTY
+    return distance
+
+
+def rank_pool(pool: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Tuple[float, Dict[str, Any]]]:
+    avoid_explicit = bool((spec.get('constraints') or {}).get('avoid_explicit'))
+    scored = [
+        (track_distance(t, spec), t) for t in pool
+        if not (avoid_explicit and t.get('explicit', False))
+    ]
+    scored.sort(key=lambda st: (st[0], -(st[1].get('popularity') or 0)))
+    return scored
+
+
+def select_tracks(
+    session: RefinementSession,
+    client: Any,
+    spec: Dict[str, Any],
+    count: int,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Re-ranks the session pool for `spec`. It fetches upstream only for genres
+    the pool doesn't cover yet, or while fewer than `count` tracks fit and the
+    pool is below MAX_POOL_TRACKS.
+    Returns (tracks, number of tracks fetched upstream). Caller holds session.lock.
+    """
+    ranked = rank_pool(session.pool, spec)
+    fitting = sum(1 for score, _ in ranked if score <= FIT_TOLERANCE)
+    seen_seeds = {g for t in session.pool for g in t.get('seed_genres') or ()}
+    uncovered = [g for g in spec['genres'] if g not in seen_seeds]
+    fetched = 0
+    # a full pool is re-ranked as-is unless the spec asks for genres it never covered
+    if uncovered or (fitting < count and len(session.pool) < MAX_POOL_TRACKS):
+        new_tracks = client.fetch_candidates(
+            spec,
+            limit=max(count - fitting, 1) * POOL_OVERSAMPLE,
+            exclude_ids={t['id'] for t in session.pool},
+            seed_genres=uncovered or None,
+        )
+        fetched = len(new_tracks)
+        if new_tracks:
+            session.pool.extend(new_tracks)
+            ranked = rank_pool(session.pool, spec)
+    # keep the best candidates (for this spec) when the pool outgrows its cap
+    if len(session.pool) > MAX_POOL_TRACKS:
+        keep = {id(t) for _, t in ranked[:MAX_POOL_TRACKS]}
+        session.pool = [t for t in session.pool if id(t) in keep]
+    session.spec = spec
+    session.count = count
+    return [dict(t) for _, t in ranked[:count]], fetched
@@ -0,0 +1,294 @@
+"""
+Replay a recorded traffic log (see traffic_recorder.py) against the API.
+
+By default the FastAPI app is driven in-process with the LLM and Spotify
+stubbed locally, so the run measures our own code rather than upstreams:
+
+    python -m backend.replay_traffic traffic.jsonl --qps 50 --concurrency 16
+
+Pass --base-url to replay against a running server instead (no stubs).
+Reports throughput, error rate and latency percentiles per endpoint.
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import httpx  # type: ignore
+
+from .seed_genres import SeedGenreIndex
+from .util.circuit_breaker import percentile
+
+
+def load_records(path: str) -> List[Dict[str, Any]]:
+    records = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(rec, dict) and rec.get("path"):
+                records.append(rec)
+    return records
+
+
+# --------------------------
+# Local stubs for upstreams
+# --------------------------
+class StubSpotifyClient:
+    """Stands in for SpotifyClient: fabricated tracks after a fixed delay."""
+
+    def __init__(self, latency_ms: float = 0.0) -> None:
+        self.latency_ms = latency_ms
+        self._fetched = 0
+        self.seed_genres = SeedGenreIndex(offline=True)
+
+    def search_tracks(self, playlist_spec: Dict[str, Any], target_count: int = 20,
+                      search_config: Optional[Dict[Any, Any]] = None) -> List[Dict[str, Any]]:
+        time.sleep(self.latency_ms / 1000.0)
+        return [
+            {
+                'uri': f'spotify:track:stub{i}',
+                'id': f'stub{i}',
+                'name': f'Stub Song {i}',
+                'artists': ['Stub Artist'],
+                'explicit': False,
+                'preview_url': None,
+                'popularity': 50,
+            }
+            for i in range(target_count)
+        ]
+
+    def fetch_candidates(self, playlist_spec: Dict[str, Any], limit: int = 50,
+                         exclude_ids: Optional[set] = None,
+                         seed_genres: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        time.sleep(self.latency_ms / 1000.0)
+        tracks = []
+        for i in range(self._fetched, self._fetched + min(limit, 100)):
+            # recommendations land near the requested targets; jitter around them
+            rnd = random.Random(i)
+            features = {}
+            for name, rng in (playlist_spec.get('audio_features') or {}).items():
+                mid = (float(rng[0]) + float(rng[1])) / 2.0
+                if name == 'tempo_bpm':
+                    features[name] = int(mid + rnd.uniform(-20, 20))
+                else:
+                    features[name] = round(min(1.0, max(0.0, mid + rnd.uniform(-0.2, 0.2))), 3)
+            tracks.append({
+                'uri': f'spotify:track:cand{i}', 'id': f'cand{i}', 'name': f'Candidate {i}',
+                'artists': ['Stub Artist'], 'explicit': False, 'preview_url': None, 'popularity': 50,
+                'seed_genres': list(seed_genres or playlist_spec.get('genres') or [])[:5],
+                'audio_features': features,
+            })
+        self._fetched += len(tracks)
+        return tracks
+
+    def iter_large_playlist(self, playlist_spec: Dict[str, Any], target_count: int,
+                            batch_size: int = 100) -> Iterator[List[Dict[str, Any]]]:
+        tracks = self.search_tracks(playlist_spec, target_count)
+        for i in range(0, len(tracks), batch_size):
+            yield tracks[i:i + batch_size]
+
+    def create_playlist(self, name: str, description: str, tracks: List[Dict[str, Any]],
+                        public: bool = True) -> Optional[Dict[str, Any]]:
+        return self.create_playlist_from_batches(name, description, [tracks], public)
+
+    def create_playlist_from_batches(self, name: str, description: str,
+                                     batches: Iterable[List[Dict[str, Any]]],
+                                     public: bool = True) -> Optional[Dict[str, Any]]:
+        time.sleep(self.latency_ms / 1000.0)
+        return {'id': 'stub-playlist', 'url': 'http://localhost/stub', 'name': name,
+                'track_count': sum(len(b) for b in batches)}
+
+
+def make_stub_llm(latency_ms: float):
+    """call_llm replacement answering with the deterministic spec for the prompt."""
+    from . import mood_to_playlist as mtp
+
+    def answer(payload: Dict[str, Any]) -> Dict[str, Any]:
+        text = " ".join(str(payload.get(k) or "") for k in ("emotion_text", "activity_text", "music_text"))
+        spec = mtp.build_spec_from_keywords(
+            tokens=mtp.tokenize(text),
+            explicit_flag=bool(payload.get("explicit")),
+            user_genres=payload.get("preferred_genres") or [],
+            user_scores=payload.get("user_scores") or {},
+        ).model_dump()
+        spec["metadata"]["fallback_used"] = False
+        return spec
+
+    def stub_call_llm(prompt_system: str, prompt_user: str, timeout: Optional[float] = None):
+        time.sleep(latency_ms / 1000.0)
+        payload = json.loads(prompt_user)
+        if "requests" in payload:
+            parsed: Any = [answer(p) for p in payload["requests"]]
+        else:
+            parsed = answer(payload)
+        return parsed, json.dumps(parsed), latency_ms
+
+    return stub_call_llm
+
+
+def build_local_client(llm_latency_ms: float, spotify_latency_ms: float) -> httpx.AsyncClient:
+    from . import integration
+    from . import mood_to_playlist as mtp
+
+    mtp.call_llm = make_stub_llm(llm_latency_ms)
+    mtp.LLM_BREAKER.reset()
+    integration.spotify = StubSpotifyClient(spotify_latency_ms)
+    transport = httpx.ASGITransport(app=integration.app)
+    return httpx.AsyncClient(transport=transport, base_url="http://replay.local")
+
+
+# --------------------------
+# Replay loop
+# --------------------------
+SKIPPED_KEY = "(skipped: id not re-issued)"
+# Path params holding ids issued by the server (see traffic_recorder.ID_ISSUING_ROUTES)
+ISSUED_PATH_PARAMS = ("session_id",)
+
+
+def live_path(rec: Dict[str, Any], issued_ids: Dict[str, str]) -> Optional[str]:
+    """Request path for the replayed server, or None if it needs an id that wasn't re-issued."""
+    params = dict(rec.get("path_params") or {})
+    route = rec.get("route")
+    if not route or not any(p in params for p in ISSUED_PATH_PARAMS):
+        return rec["path"]
+    for name in ISSUED_PATH_PARAMS:
+        if name in params:
+            if params[name] not in issued_ids:
+                return None
+            params[name] = issued_ids[params[name]]
+    return route.format(**params)
+
+
+async def replay(
+    records: Iterable[Dict[str, Any]],
+    client: httpx.AsyncClient,
+    qps: float,
+    concurrency: int,
+) -> Tuple[Dict[str, List[Tuple[float, bool]]], float]:
+    """
+    Fire records at `qps` (0 = unpaced) from `concurrency` worker tasks.
+    Results are grouped by route template.
+
+    With pacing, latency is measured from each record's scheduled send time,
+    so time spent waiting for a free worker counts (no coordinated omission).
+
+    Ids issued by the recorded server (refinement session ids) are mapped onto
+    the ids the replayed server issues; records whose id was never re-issued
+    are skipped and counted under SKIPPED_KEY instead of failing with a 404.
+    """
+    results: Dict[str, List[Tuple[float, bool]]] = defaultdict(list)
+    start = time.perf_counter()
+    # shared by the workers; records are pulled lazily, so memory doesn't grow with the log
+    schedule = enumerate(records)
+    issued_ids: Dict[str, str] = {}
+
+    async def worker() -> None:
+        for i, rec in schedule:
+            if qps > 0:
+                scheduled = start + i / qps
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            else:
+                scheduled = time.perf_counter()
+            route = rec.get("route") or rec["path"]
+            path = live_path(rec, issued_ids)
+            if path is None:
+                results[SKIPPED_KEY].append((0.0, True))
+                continue
+            try:
+                resp = await client.request(
+                    rec.get("method", "POST"),
+                    path,
+                    json=rec.get("body") if rec.get("body") is not None else None,
+                )
+                ok = resp.status_code < 400
+                for key, recorded_id in (rec.get("issued") or {}).items():
+                    live_id = resp.json().get(key) if ok else None
+                    if isinstance(live_id, str):
+                        issued_ids[recorded_id] = live_id
+            except Exception:
+                ok = False
+            results[route].append(((time.perf_counter() - scheduled) * 1000, ok))
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return results, time.perf_counter() - start
+
+
+def summarize(results: Dict[str, List[Tuple[float, bool]]], elapsed: float) -> Dict[str, Dict[str, Any]]:
+    report = {}
+    for path, samples in sorted(results.items()):
+        latencies = [lat for lat, _ in samples]
+        errors = sum(1 for _, ok in samples if not ok)
+        report[path] = {
+            "requests": len(samples),
+            "throughput_rps": round(len(samples) / elapsed, 1) if elapsed > 0 else 0.0,
+            "error_rate": round(errors / len(samples), 3),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(max(latencies), 2),
+        }
+    return report
+
+
+def print_report(report: Dict[str, Dict[str, Any]], elapsed: float) -> None:
+    header = f"{'endpoint':<28}{'reqs':>7}{'rps':>9}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print("-" * len(header))
+    for path, r in report.items():
+        print(f"{path:<28}{r['requests']:>7}{r['throughput_rps']:>9}{r['error_rate'] * 100:>6.1f}%"
+              f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{r['max_ms']:>9}")
+    print(f"\nTotal: {sum(r['requests'] for r in report.values())} requests in {elapsed:.2f}s")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded VibeChef API traffic")
+    parser.add_argument("log", help="JSONL traffic log written by TrafficRecorderMiddleware")
+    parser.add_argument("--qps", type=float, default=0.0, help="target requests/second (0 = as fast as possible)")
+    parser.add_argument("--concurrency", type=int, default=8, help="max requests in flight")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the log this many times")
+    parser.add_argument("--base-url", default=None, help="replay against a live server instead of in-process stubs")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="simulated LLM latency (stub mode)")
+    parser.add_argument("--spotify-latency-ms", type=float, default=0.0, help="simulated Spotify latency (stub mode)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    records = load_records(args.log)
+    if not records:
+        print(f"No replayable records in {args.log}", file=sys.stderr)
+        return 1
+    stream = itertools.chain.from_iterable(itertools.repeat(records, max(1, args.repeat)))
+
+    async def run() -> Tuple[Dict[str, List[Tuple[float, bool]]], float]:
+        if args.base_url:
+            client = httpx.AsyncClient(base_url=args.base_url, timeout=30.0)
+        else:
+            client = build_local_client(args.llm_latency_ms, args.spotify_latency_ms)
+        async with client:
+            return await replay(stream, client, args.qps, args.concurrency)
+
+    results, elapsed = asyncio.run(run())
+    report = summarize(results, elapsed)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, elapsed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
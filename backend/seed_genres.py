@@ -0,0 +1,241 @@
+from __future__ import annotations
+import difflib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, FrozenSet, List, Optional
+
+from .util.cache import BoundedCache
+
+SEED_GENRES_FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "seed_genres.json")
+SEED_GENRES_CACHE_PATH = os.getenv(
+    "VIBECHEF_SEED_GENRES_CACHE", os.path.join(tempfile.gettempdir(), "vibechef-seed-genres.json")
+)
+# Offline mode (tests, replay): serve the fixture and never call upstream
+SEED_GENRES_OFFLINE = os.getenv("VIBECHEF_SEED_GENRES_OFFLINE", "0") == "1"
+SEED_GENRES_TTL_SECONDS = 24 * 60 * 60
+SEED_GENRES_RETRY_SECONDS = 5 * 60     # wait after a failed refresh before trying again
+MAX_SEEDS_PER_GENRE = 2
+MAX_SEED_GENRES = 5                    # Spotify's limit per recommendations call
+MAX_TRACKED_GENRES = 1000              # bounds per-genre stats; later genres only count in totals
+FUZZY_CUTOFF = 0.8
+
+# Common spec genres that aren't seeds and don't resolve by spelling
+SEED_ALIASES = {
+    "lo-fi": ["chill", "study"],
+    "lofi": ["chill", "study"],
+    "psychedelic": ["psych-rock"],
+    "psytrance": ["trance"],
+    "experimental": ["idm"],
+    "minimal": ["minimal-techno"],
+    "world": ["world-music"],
+    "workout": ["work-out"],
+    "soundtrack": ["soundtracks"],
+    "christmas": ["holidays"],
+}
+
+
+def seed_key(genre: str) -> str:
+    """Spotify seed spelling: lowercase, '&' as '-n-', words joined by '-'."""
+    key = genre.strip().lower().replace("&", "-n-")
+    return re.sub(r"[\s_\-]+", "-", key).strip("-")
+
+
+class SeedGenreIndex:
+    """
+    Locally cached set of valid recommendation seed genres.
+
+    Loads the last fetched list from disk (or the bundled fixture), refreshes
+    it in the background once it is older than ttl_seconds, and maps spec
+    genres onto the closest valid seeds so recommendations are never called
+    with seeds that can only come back empty. Keeps per-genre hit rates.
+    """
+
+    def __init__(
+        self,
+        fetch: Optional[Callable[[], Optional[List[str]]]] = None,
+        cache_path: str = SEED_GENRES_CACHE_PATH,
+        fixture_path: str = SEED_GENRES_FIXTURE_PATH,
+        ttl_seconds: float = SEED_GENRES_TTL_SECONDS,
+        offline: bool = SEED_GENRES_OFFLINE,
+    ) -> None:
+        self.offline = offline
+        self.fetch = None if offline else fetch
+        self.cache_path = cache_path
+        self.fixture_path = fixture_path
+        self.ttl_seconds = ttl_seconds
+        self.seeds: FrozenSet[str] = frozenset()
+        self.source = "none"
+        self.fetched_at = 0.0
+        self._resolved = BoundedCache(MAX_TRACKED_GENRES)
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._next_attempt = 0.0
+        self.lookups = 0
+        self.unmatched = 0
+        self.skipped_calls = 0
+        self._genre_stats: Dict[str, Dict[str, int]] = {}
+        self._seed_stats: Dict[str, Dict[str, int]] = {}
+        self._load()
+
+    # --------------------------
+    # Loading / refresh
+    # --------------------------
+    def _load(self) -> None:
+        sources = [(self.cache_path, "cache"), (self.fixture_path, "fixture")]
+        # offline runs are pinned to the fixture, whatever a previous run left on disk
+        for path, source in sources[1:] if self.offline else sources:
+            try:
+                with open(path, encoding="utf-8") as fh:
+                    data = json.load(fh)
+            except (OSError, ValueError):
+                continue
+            genres = data.get("genres") if isinstance(data, dict) else None
+            if genres:
+                # the fixture carries no timestamp, so it is always due for a refresh
+                self._install(genres, source, float(data.get("fetched_at", 0.0)))
+                return
+        print("⚠️  No seed-genre list available; recommendations are skipped until a refresh succeeds")
+
+    def _install(self, genres: List[str], source: str, fetched_at: float) -> None:
+        seeds = frozenset(seed_key(g) for g in genres if isinstance(g, str) and g.strip())
+        # mappings depend on the seed set; start a fresh resolution cache with it
+        self._resolved = BoundedCache(MAX_TRACKED_GENRES)
+        self.seeds = seeds
+        self.source = source
+        self.fetched_at = fetched_at
+
+    def maybe_refresh(self) -> None:
+        """Starts a background refresh when the list is stale (never blocks the caller)."""
+        if self.fetch is None:
+            return
+        now = time.time()
+        if now - self.fetched_at < self.ttl_seconds or now < self._next_attempt:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self.refresh, name="seed-genre-refresh", daemon=True).start()
+
+    def refresh(self) -> bool:
+        """Fetches the seed list upstream and persists it. Returns True on success."""
+        try:
+            genres = self.fetch() if self.fetch else None
+            if not genres:
+                raise RuntimeError("empty seed-genre list")
+            fetched_at = time.time()
+            self._install(genres, "spotify", fetched_at)
+            self._persist(sorted(self.seeds), fetched_at)
+            print(f"✅ Refreshed {len(self.seeds)} seed genres")
+            return True
+        except Exception as e:
+            print(f"Error refreshing seed genres: {e}")
+            self._next_attempt = time.time() + SEED_GENRES_RETRY_SECONDS
+            return False
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _persist(self, genres: List[str], fetched_at: float) -> None:
+        tmp = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump({"fetched_at": fetched_at, "genres": genres}, fh)
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            print(f"Error saving seed genres: {e}")
+
+    # --------------------------
+    # Mapping
+    # --------------------------
+    def closest_seeds(self, genre: str) -> List[str]:
+        """Valid seeds for one spec genre, best first (empty if nothing is close)."""
+        key = seed_key(genre)
+        seeds = self.seeds
+        if not key or not seeds:
+            return []
+        if key in seeds:
+            return [key]
+        aliased = [s for s in SEED_ALIASES.get(key, []) if s in seeds]
+        if aliased:
+            return aliased[:MAX_SEEDS_PER_GENRE]
+        # spelling variants: "hiphop" -> "hip-hop", "synthpop" -> "synth-pop"
+        squashed = key.replace("-", "")
+        variants = [s for s in seeds if s.replace("-", "") == squashed]
+        if variants:
+            return variants[:MAX_SEEDS_PER_GENRE]
+        close = difflib.get_close_matches(key, seeds, n=MAX_SEEDS_PER_GENRE, cutoff=FUZZY_CUTOFF)
+        if close:
+            return close
+        # compound genres: "classic-rock" -> "rock", "tropical-house" -> "house"
+        parts = [p for p in reversed(key.split("-")) if p in seeds]
+        return parts[:MAX_SEEDS_PER_GENRE]
+
+    def resolve(self, genres: List[str], limit: int = MAX_SEED_GENRES) -> List[str]:
+        """Maps spec genres to at most `limit` distinct valid seeds, recording hit stats."""
+        self.maybe_refresh()
+        out: List[str] = []
+        for genre in genres:
+            if not isinstance(genre, str):
+                continue
+            key = seed_key(genre)
+            mapped = self._resolved.get(key)
+            if mapped is None:
+                mapped = tuple(self.closest_seeds(genre))
+                self._resolved.put(key, mapped)
+            self._record_lookup(key, bool(mapped))
+            for seed in mapped:
+                if seed not in out:
+                    out.append(seed)
+        return out[:limit]
+
+    # --------------------------
+    # Stats
+    # --------------------------
+    def _record_lookup(self, key: str, hit: bool) -> None:
+        with self._lock:
+            self.lookups += 1
+            if not hit:
+                self.unmatched += 1
+            stats = self._genre_stats.get(key)
+            if stats is None:
+                if len(self._genre_stats) >= MAX_TRACKED_GENRES:
+                    return
+                stats = self._genre_stats[key] = {"lookups": 0, "hits": 0}
+            stats["lookups"] += 1
+            stats["hits"] += int(hit)
+
+    def record_skip(self) -> None:
+        """A recommendations call was skipped because no spec genre had a valid seed."""
+        with self._lock:
+            self.skipped_calls += 1
+
+    def record_result(self, seeds: List[str], track_count: int) -> None:
+        """Outcome of one recommendations call made with `seeds`."""
+        with self._lock:
+            for seed in seeds:
+                stats = self._seed_stats.setdefault(seed, {"calls": 0, "empty": 0})
+                stats["calls"] += 1
+                stats["empty"] += int(track_count == 0)
+
+    def snapshot(self, top: int = 20) -> Dict[str, Any]:
+        with self._lock:
+            genres = sorted(self._genre_stats.items(), key=lambda kv: -kv[1]["lookups"])[:top]
+            return {
+                "seeds": len(self.seeds),
+                "source": self.source,
+                "age_seconds": round(time.time() - self.fetched_at) if self.fetched_at else None,
+                "lookups": self.lookups,
+                "hit_rate": round(1 - self.unmatched / self.lookups, 3) if self.lookups else None,
+                "skipped_calls": self.skipped_calls,
+                "genres": {
+                    key: {**s, "hit_rate": round(s["hits"] / s["lookups"], 3),
+                          "seeds": list(self._resolved.get(key) or ())}
+                    for key, s in genres
+                },
+                "recommendations": {seed: dict(s) for seed, s in self._seed_stats.items()},
+            }
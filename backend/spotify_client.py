@@ -1,12 +1,58 @@
 import os
+import random
 import time
-from typing import List, Dict, Optional, Any
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Any, Set, Tuple
 import spotipy  # type: ignore
 from spotipy.oauth2 import SpotifyOAuth  # type: ignore
 from dotenv import load_dotenv  # type: ignore
 
+from .seed_genres import SeedGenreIndex
+
 load_dotenv()
 
+# Spotify audio-features keys we keep on candidate tracks (tempo renamed to match PlaylistSpec)
+AUDIO_FEATURE_KEYS = ('energy', 'valence', 'danceability', 'acousticness', 'instrumentalness', 'tempo')
+
+# Large-playlist mode (target_count above the single recommendations call limit)
+LARGE_PLAYLIST_THRESHOLD = 100
+LARGE_PLAYLIST_WORKERS = 8
+LARGE_PLAYLIST_CALLS_PER_100 = 6   # upstream call budget per 100 requested tracks
+LARGE_PLAYLIST_MAX_TRACKS = 1000   # ceiling on target_count (and so on quota spent per request)
+LARGE_PLAYLIST_MAX_CALLS = LARGE_PLAYLIST_MAX_TRACKS // 100 * LARGE_PLAYLIST_CALLS_PER_100
+PLAYLIST_BATCH_SIZE = 100          # Spotify's max items per playlist_add_items call
+SEARCH_PAGE_SIZE = 50
+SEARCH_MAX_OFFSET = 1000           # Spotify search does not page past this
+RANGE_TOLERANCE = 0.1              # slack when range-filtering keyword search results
+
+
+def format_track(track: Dict[str, Any]) -> Dict[str, Any]:
+    """Trim a Spotify track object to the fields the API returns"""
+    return {
+        'uri': track['uri'],
+        'id': track['id'],
+        'name': track['name'],
+        'artists': [artist['name'] for artist in track['artists']],
+        'explicit': track.get('explicit', False),
+        'preview_url': track.get('preview_url'),
+        'popularity': track.get('popularity', 0)
+    }
+
+
+def track_in_ranges(track: Dict[str, Any], ranges: Dict[str, Any], tolerance: float = RANGE_TOLERANCE) -> bool:
+    """True if the track's audio features sit inside the spec ranges (tracks without features pass)"""
+    features = track.get('audio_features')
+    if not features:
+        return True
+    for name, rng in ranges.items():
+        value = features.get(name)
+        if value is None or not (isinstance(rng, (list, tuple)) and len(rng) == 2):
+            continue
+        slack = tolerance * 150 if name == 'tempo_bpm' else tolerance
+        if value < float(rng[0]) - slack or value > float(rng[1]) + slack:
+            return False
+    return True
+
 
 class SpotifyClient:
     def __init__(self) -> None:
@@ -14,6 +60,13 @@ class SpotifyClient:
         self.sp = None
         self.auth_manager = None
         self.setup_auth()
+        # spec genres are mapped onto valid seeds before any recommendations call
+        self.seed_genres = SeedGenreIndex(fetch=self._fetch_seed_genres)
+
+    def _fetch_seed_genres(self) -> Optional[List[str]]:
+        if not self.sp:
+            return None
+        return self.sp.recommendation_genre_seeds().get('genres')
 
     def setup_auth(self) -> None:
         """Set up Spotify authentication"""
@@ -77,6 +130,9 @@ class SpotifyClient:
         Main function: Convert playlist spec to actual tracks
         Returns: List of track objects with all metadata
         """
+        if target_count > LARGE_PLAYLIST_THRESHOLD:
+            return [t for batch in self.iter_large_playlist(playlist_spec, target_count) for t in batch]
+
         tracks: List[Dict[str, Any]] = []
 
         # Extract from spec (supports Dev2 PlaylistSpec and legacy flat)
@@ -104,12 +160,19 @@ class SpotifyClient:
             # Layer 1: Get recommendations based on genres and features
             if not self.sp:
                 raise RuntimeError("Spotify client not initialized")
-            recommendations = self.sp.recommendations(
-                seed_genres=[g for g in genres if isinstance(g, str)][:5],  # Max 5 genres
-                target_energy=energy,
-                target_valence=valence,
-                limit=min(target_count * 2, 100)  # Get extra to filter
-            )
+            seeds = self.seed_genres.resolve(genres)  # Max 5 genres
+            if seeds:
+                recommendations = self.sp.recommendations(
+                    seed_genres=seeds,
+                    target_energy=energy,
+                    target_valence=valence,
+                    limit=min(target_count * 2, 100)  # Get extra to filter
+                )
+                self.seed_genres.record_result(seeds, len(recommendations['tracks']))
+            else:
+                # no valid seeds: recommendations would come back empty, go straight to search
+                self.seed_genres.record_skip()
+                recommendations = {'tracks': []}
 
             # Process each track
             for track in recommendations['tracks']:
@@ -118,15 +181,7 @@ class SpotifyClient:
                     continue
 
                 # Format track data
-                track_data = {
-                    'uri': track['uri'],
-                    'id': track['id'],
-                    'name': track['name'],
-                    'artists': [artist['name'] for artist in track['artists']],
-                    'explicit': track.get('explicit', False),
-                    'preview_url': track.get('preview_url'),
-                    'popularity': track.get('popularity', 0)
-                }
+                track_data = format_track(track)
 
                 tracks.append(track_data)
 
@@ -154,15 +209,7 @@ class SpotifyClient:
                         if any(t['id'] == track['id'] for t in tracks):
                             continue
 
-                        track_data = {
-                            'uri': track['uri'],
-                            'id': track['id'],
-                            'name': track['name'],
-                            'artists': [artist['name'] for artist in track['artists']],
-                            'explicit': track.get('explicit', False),
-                            'preview_url': track.get('preview_url'),
-                            'popularity': track.get('popularity', 0)
-                        }
+                        track_data = format_track(track)
                         tracks.append(track_data)
 
                         if len(tracks) >= target_count:
@@ -178,12 +225,205 @@ class SpotifyClient:
             print(f"Error searching tracks: {e}")
             return tracks  # Return what we have
 
+    def fetch_candidates(self, playlist_spec: Dict[str, Any], limit: int = 50,
+                         exclude_ids: Optional[set] = None,
+                         seed_genres: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Candidate pool for refinement sessions: recommendation results with
+        their audio features attached, tagged with the seed genres used.
+        """
+        exclude_ids = exclude_ids or set()
+        audio = playlist_spec.get('audio_features') or {}
+        genres = seed_genres or [g for g in playlist_spec.get('genres', ['pop']) if isinstance(g, str)]
+        genres = genres[:5]
+        seeds = self.seed_genres.resolve(genres)
+
+        def mid(v: Any) -> Optional[float]:
+            if isinstance(v, (list, tuple)) and len(v) == 2:
+                return (float(v[0]) + float(v[1])) / 2.0
+            return None
+
+        targets = {f'target_{k}': mid(audio.get(k)) for k in ('energy', 'valence', 'danceability', 'acousticness', 'instrumentalness')}
+        targets['target_tempo'] = mid(audio.get('tempo_bpm'))
+        targets = {k: v for k, v in targets.items() if v is not None}
+
+        try:
+            if not self.sp:
+                raise RuntimeError("Spotify client not initialized")
+            if not seeds:
+                self.seed_genres.record_skip()
+                return []
+            recommendations = self.sp.recommendations(
+                seed_genres=seeds,
+                limit=min(max(limit, 1), 100),
+                **targets
+            )
+            self.seed_genres.record_result(seeds, len(recommendations['tracks']))
+            tracks = [format_track(t) for t in recommendations['tracks'] if t['id'] not in exclude_ids]
+            # tagged with the spec genres (not the mapped seeds) so refinement sees them as covered
+            for t in tracks:
+                t['seed_genres'] = list(genres)
+            return self.attach_audio_features(tracks)
+        except Exception as e:
+            print(f"Error fetching candidates: {e}")
+            return []
+
+    def attach_audio_features(self, tracks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Adds an 'audio_features' dict to each track (batched, 100 ids per call)"""
+        if not self.sp:
+            return tracks
+        for i in range(0, len(tracks), 100):
+            batch = tracks[i:i+100]
+            try:
+                features = self.sp.audio_features([t['id'] for t in batch]) or []
+            except Exception as e:
+                print(f"Error fetching audio features: {e}")
+                features = []
+            for track, af in zip(batch, features):
+                if af:
+                    track['audio_features'] = {
+                        ('tempo_bpm' if k == 'tempo' else k): af.get(k) for k in AUDIO_FEATURE_KEYS
+                    }
+        return tracks
+
+    def iter_large_playlist(self, playlist_spec: Dict[str, Any], target_count: int,
+                            batch_size: int = PLAYLIST_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Large-playlist mode: runs seed/feature-jittered recommendation calls and
+        paginated keyword searches in parallel, streams results through dedup and
+        range filtering, and yields batches of `batch_size` tracks as they fill.
+        Upstream calls (and memory) scale linearly with target_count.
+        """
+        if not self.sp:
+            print("Error searching tracks: Spotify client not initialized")
+            return
+        audio = playlist_spec.get('audio_features') or {}
+        constraints = playlist_spec.get('constraints') or {}
+        avoid_explicit = bool(constraints.get('avoid_explicit', playlist_spec.get('avoid_explicit', False)))
+        target_count = min(target_count, LARGE_PLAYLIST_MAX_TRACKS)
+        budget = min(LARGE_PLAYLIST_MAX_CALLS, max(1, -(-target_count // 100) * LARGE_PLAYLIST_CALLS_PER_100))
+        jobs = self._large_playlist_jobs(playlist_spec, budget)
+
+        seen_ids: Set[str] = set()
+        seen_songs: Set[Tuple[str, str]] = set()
+        batch: List[Dict[str, Any]] = []
+        produced = 0
+
+        with ThreadPoolExecutor(max_workers=LARGE_PLAYLIST_WORKERS) as pool:
+            pending = set()
+            # keep a bounded number of calls in flight instead of submitting the whole budget
+            for job in jobs:
+                pending.add(pool.submit(job))
+                if len(pending) >= LARGE_PLAYLIST_WORKERS:
+                    break
+            while pending and produced < target_count:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    try:
+                        results, needs_range_check = fut.result()
+                    except Exception as e:
+                        print(f"Error in large-playlist call: {e}")
+                        results, needs_range_check = [], False
+                    fresh = []
+                    for track in results:
+                        if not track or not track.get('id') or track['id'] in seen_ids:
+                            continue
+                        if avoid_explicit and track.get('explicit', False):
+                            continue
+                        song = (track['name'].lower(), track['artists'][0]['name'].lower() if track['artists'] else '')
+                        if song in seen_songs:
+                            continue
+                        seen_ids.add(track['id'])
+                        seen_songs.add(song)
+                        fresh.append(format_track(track))
+                    if needs_range_check and fresh:
+                        fresh = [t for t in self.attach_audio_features(fresh) if track_in_ranges(t, audio)]
+                        for t in fresh:
+                            t.pop('audio_features', None)
+                    for t in fresh:
+                        if produced >= target_count:
+                            break
+                        batch.append(t)
+                        produced += 1
+                        if len(batch) >= batch_size:
+                            yield batch
+                            batch = []
+                # top the pipeline back up
+                for job in jobs:
+                    pending.add(pool.submit(job))
+                    if len(pending) >= LARGE_PLAYLIST_WORKERS:
+                        break
+            for fut in pending:
+                fut.cancel()
+        if batch:
+            yield batch
+        print(f"Found {produced} tracks (large-playlist mode)")
+
+    def _large_playlist_jobs(self, playlist_spec: Dict[str, Any],
+                             budget: int) -> Iterator[Callable[[], Tuple[List[Dict[str, Any]], bool]]]:
+        """Yields up to `budget` upstream calls: jittered recommendations interleaved with search pages"""
+        sp = self.sp
+        index = self.seed_genres
+        genres = index.resolve([g for g in playlist_spec.get('genres', ['pop']) if isinstance(g, str)] or ['pop'])
+        audio = playlist_spec.get('audio_features') or {}
+        keywords = playlist_spec.get('mood_descriptors') or playlist_spec.get('keywords') or ['happy', 'chill']
+        rnd = random.Random(0)
+
+        def recommendations_job(seeds: List[str], params: Dict[str, Any]) -> Callable[[], Tuple[List[Dict[str, Any]], bool]]:
+            def run() -> Tuple[List[Dict[str, Any]], bool]:
+                results = sp.recommendations(seed_genres=seeds, limit=100, **params)['tracks']
+                index.record_result(seeds, len(results))
+                return results, False
+            return run
+
+        def search_job(keyword: str, offset: int) -> Callable[[], Tuple[List[Dict[str, Any]], bool]]:
+            def run() -> Tuple[List[Dict[str, Any]], bool]:
+                res = sp.search(q=keyword, type='track', limit=SEARCH_PAGE_SIZE, offset=offset)
+                return res['tracks']['items'], True
+            return run
+
+        search_pages = ((kw, offset) for offset in range(0, SEARCH_MAX_OFFSET, SEARCH_PAGE_SIZE) for kw in keywords)
+        if not genres:
+            # no valid seeds: spend the whole budget on search pages
+            index.record_skip()
+        for i in range(budget):
+            # two recommendation calls per search page: recommendations are pre-filtered upstream
+            if i % 3 == 2 or not genres:
+                page = next(search_pages, None)
+                if page is not None:
+                    yield search_job(*page)
+                    continue
+                if not genres:
+                    return
+            seeds = rnd.sample(genres, k=min(len(genres), rnd.randint(1, 2)))
+            params: Dict[str, Any] = {}
+            for name, rng in audio.items():
+                if not (isinstance(rng, (list, tuple)) and len(rng) == 2):
+                    continue
+                key = 'tempo' if name == 'tempo_bpm' else name
+                lo, hi = float(rng[0]), float(rng[1])
+                params[f'min_{key}'] = lo
+                params[f'max_{key}'] = hi
+                params[f'target_{key}'] = rnd.uniform(lo, hi)  # jitter within the range
+            yield recommendations_job(seeds, params)
+
     def create_playlist(self, name: str, description: str, tracks: List[Dict[str, Any]],
                        public: bool = True) -> Optional[Dict[str, Any]]:
         """
         Create a Spotify playlist and add tracks
         Returns: playlist metadata with URL
         """
+        batches = (tracks[i:i+PLAYLIST_BATCH_SIZE] for i in range(0, len(tracks), PLAYLIST_BATCH_SIZE))
+        return self.create_playlist_from_batches(name, description, batches, public=public)
+
+    def create_playlist_from_batches(self, name: str, description: str,
+                                     batches: Iterable[List[Dict[str, Any]]],
+                                     public: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Create a Spotify playlist and add each batch of tracks as it arrives
+        (e.g. straight from iter_large_playlist)
+        Returns: playlist metadata with URL
+        """
         try:
             # Get user ID
             if not self.sp:
@@ -200,18 +440,19 @@ class SpotifyClient:
             )
 
             # Add tracks in batches (max 100 per request)
-            track_uris = [track['uri'] for track in tracks]
-
-            for i in range(0, len(track_uris), 100):
-                batch = track_uris[i:i+100]
-                self.sp.playlist_add_items(playlist['id'], batch)
-                time.sleep(0.1)  # Rate limiting
+            track_count = 0
+            for batch in batches:
+                for i in range(0, len(batch), PLAYLIST_BATCH_SIZE):
+                    track_uris = [track['uri'] for track in batch[i:i+PLAYLIST_BATCH_SIZE]]
+                    self.sp.playlist_add_items(playlist['id'], track_uris)
+                    track_count += len(track_uris)
+                    time.sleep(0.1)  # Rate limiting
 
             return {
                 'id': playlist['id'],
                 'url': playlist['external_urls']['spotify'],
                 'name': playlist['name'],
-                'track_count': len(tracks)
+                'track_count': track_count
             }
 
         except Exception as e:
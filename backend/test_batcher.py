@@ -0,0 +1,113 @@
+import threading
+import time
+
+from backend import mood_to_playlist as mtp
+from backend.util.batcher import MicroBatcher
+
+
+def test_flushes_when_batch_is_full():
+    batches = []
+    batcher = MicroBatcher(lambda items: (batches.append(list(items)), items)[1],
+                           max_batch_size=3, max_wait_ms=5000)
+    futures = [batcher.submit(i) for i in range(3)]
+    assert [f.result(timeout=1) for f in futures] == [0, 1, 2]
+    assert batches == [[0, 1, 2]]
+
+
+def test_flushes_partial_batch_after_max_wait():
+    batcher = MicroBatcher(lambda items: [i * 10 for i in items], max_batch_size=8, max_wait_ms=20)
+    started = time.monotonic()
+    assert batcher.submit(4).result(timeout=1) == 40
+    assert time.monotonic() - started < 0.5
+    assert batcher.batches_sent == 1 and batcher.items_sent == 1
+
+
+def test_batches_are_sent_concurrently_up_to_max_in_flight():
+    active, peak = [0], [0]
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def send(items):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        release.wait(timeout=2)
+        with lock:
+            active[0] -= 1
+        return items
+
+    batcher = MicroBatcher(send, max_batch_size=1, max_wait_ms=1, max_in_flight=3)
+    futures = [batcher.submit(i) for i in range(6)]
+    time.sleep(0.2)
+    assert peak[0] == 3          # three sends in flight, the rest still queued
+    release.set()
+    assert [f.result(timeout=2) for f in futures] == list(range(6))
+    assert peak[0] == 3
+
+
+def test_cancelled_items_are_dropped_before_sending():
+    sent = []
+    gate = threading.Event()
+
+    def send(items):
+        sent.extend(items)
+        gate.wait(timeout=2)
+        return items
+
+    batcher = MicroBatcher(send, max_batch_size=1, max_wait_ms=1, max_in_flight=1)
+    first = batcher.submit("first")
+    time.sleep(0.1)              # "first" occupies the only slot
+    abandoned = [batcher.submit(f"late{i}") for i in range(3)]
+    for fut in abandoned:
+        assert fut.cancel()
+    kept = batcher.submit("kept")
+    gate.set()
+    assert first.result(timeout=2) == "first"
+    assert kept.result(timeout=2) == "kept"
+    assert sent == ["first", "kept"]
+    assert batcher.items_dropped == 3
+
+
+def test_send_errors_and_short_results_resolve_to_none():
+    failing = MicroBatcher(lambda items: 1 / 0, max_batch_size=2, max_wait_ms=50)
+    futures = [failing.submit(i) for i in range(2)]
+    assert [f.result(timeout=1) for f in futures] == [None, None]
+
+    short = MicroBatcher(lambda items: items[:1], max_batch_size=2, max_wait_ms=50)
+    futures = [short.submit(i) for i in range(2)]
+    assert [f.result(timeout=1) for f in futures] == [0, None]
+
+
+def test_send_llm_batch_rejects_lone_spec_and_count_mismatch(monkeypatch):
+    breaker = mtp.LLM_BREAKER
+    breaker.reset()
+    answers = iter([
+        {"genres": ["pop"], "mood_descriptors": ["calm"]},   # a single spec, not a batch
+        [{"a": 1}],                                          # one result for two prompts
+        {"specs": [{"a": 1}, {"b": 2}]},                     # known wrapper
+    ])
+    monkeypatch.setattr(mtp, "call_llm", lambda *args, **kwargs: (next(answers), "", 10.0))
+    assert mtp.send_llm_batch(["{}", "{}"]) == [None, None]
+    assert mtp.send_llm_batch(["{}", "{}"]) == [None, None]
+    assert mtp.send_llm_batch(["{}", "{}"]) == [{"a": 1}, {"b": 2}]
+    assert breaker.snapshot()["samples"] == 3
+    assert round(breaker.snapshot()["error_rate"], 3) == 0.667
+    breaker.reset()
+
+
+def test_batched_interpretations_overlap_round_trips(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from backend.replay_traffic import make_stub_llm
+
+    monkeypatch.setattr(mtp, "call_llm", make_stub_llm(300))
+    monkeypatch.setattr(mtp, "USE_LLM", True)
+    monkeypatch.setattr(mtp, "USE_LLM_BATCHING", True)
+    mtp.LLM_BREAKER.reset()
+    started = time.monotonic()
+    with ThreadPoolExecutor(40) as pool:
+        specs = list(pool.map(lambda i: mtp.interpret_mood(f"happy {i}", "run", "rock", {}), range(40)))
+    elapsed = time.monotonic() - started
+    assert not any(spec.metadata.fallback_used for spec in specs)
+    # 5 batches of 8 go out together: about one LLM round trip, not five
+    assert elapsed < 0.9
+    mtp.LLM_BREAKER.reset()
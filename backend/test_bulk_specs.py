@@ -0,0 +1,59 @@
+import json
+
+import pytest  # type: ignore
+
+from backend import bulk_specs
+
+
+def write_corpus(path, lines):
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def read_output(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_invalid_json_rows_keep_numbering_and_are_reported(tmp_path):
+    corpus = write_corpus(tmp_path / "corpus.jsonl", [
+        json.dumps({"id": "a", "mood": "happy"}),
+        '{"mood": "sad"',
+        "[1, 2]",
+        json.dumps({"id": "d", "mood": "calm"}),
+    ])
+    out = tmp_path / "specs.jsonl"
+    bulk_specs.run(corpus, str(out), workers=1, chunk_size=2, use_llm=False)
+
+    records = read_output(out)
+    assert [r["row"] for r in records] == [0, 1, 2, 3]
+    assert records[1] == {"row": 1, "error": "invalid JSON"}
+    assert records[2] == {"row": 2, "error": "invalid JSON"}
+    assert "spec" in records[0] and records[3]["id"] == "d"
+
+
+def test_existing_output_without_checkpoint_needs_restart(tmp_path):
+    corpus = write_corpus(tmp_path / "corpus.jsonl", [json.dumps({"mood": "happy"})])
+    out = tmp_path / "specs.jsonl"
+    out.write_text('{"row": 0, "id": "precious"}\n')
+
+    with pytest.raises(SystemExit):
+        bulk_specs.run(corpus, str(out), workers=1, use_llm=False)
+    assert "precious" in out.read_text()
+
+    bulk_specs.run(corpus, str(out), workers=1, use_llm=False, resume=False)
+    assert [r["row"] for r in read_output(out)] == [0]
+
+
+def test_parquet_resume_keeps_closed_parts(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    corpus = write_corpus(tmp_path / "corpus.csv", ["mood"] + [f"mood {i}" for i in range(5)])
+    out = tmp_path / "specs_parquet"
+    bulk_specs.run(corpus, str(out), fmt="parquet", workers=1, chunk_size=2, use_llm=False, part_rows=2)
+
+    checkpoint = bulk_specs.load_checkpoint(f"{out}.ckpt")
+    assert checkpoint["parts"] == ["part-00000.parquet", "part-00001.parquet", "part-00002.parquet"]
+    rows = [r for part in checkpoint["parts"] for r in pq.read_table(out / part).column("row").to_pylist()]
+    assert rows == list(range(5))
+
+    summary = bulk_specs.run(corpus, str(out), fmt="parquet", workers=1, use_llm=False, part_rows=2)
+    assert summary["resumed_from"] == 5 and summary["rows_written"] == 0
@@ -0,0 +1,116 @@
+import pytest  # type: ignore
+
+from backend.util.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, percentile
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_breaker(clock, **kwargs):
+    options = dict(window=10, min_samples=4, max_error_rate=0.5, max_p95_ms=1000.0,
+                   cooldown_seconds=30.0, max_timeout_seconds=5.0, min_timeout_seconds=0.5)
+    options.update(kwargs)
+    return CircuitBreaker(clock=clock, **options)
+
+
+def test_trips_on_error_rate_and_short_circuits(clock):
+    breaker = make_breaker(clock)
+    for ok in (True, False, False):
+        breaker.record(100, ok)
+    assert breaker.state == CLOSED          # below min_samples
+    breaker.record(100, False)
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    snap = breaker.snapshot()
+    assert snap["trips"] == 1 and snap["short_circuited"] == 1
+    assert snap["last_trip_reason"].startswith("error rate")
+
+
+def test_trips_on_p95_latency(clock):
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record(2000, True)
+    assert breaker.state == OPEN
+    assert breaker.snapshot()["last_trip_reason"].startswith("p95 latency")
+
+
+def test_half_open_allows_one_probe(clock):
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record(100, False)
+    clock.advance(29.9)
+    assert not breaker.allow_request()
+    clock.advance(0.1)
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()      # only one probe at a time
+
+    breaker.record(100, True)
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["samples"] == 1
+
+
+def test_failed_probe_reopens(clock):
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record(100, False)
+    clock.advance(30)
+    assert breaker.allow_request()
+    breaker.record(1500, True)              # too slow counts as a failed probe
+    assert breaker.state == OPEN
+    assert breaker.snapshot()["trips"] == 2
+    assert not breaker.allow_request()
+
+
+def test_stale_probe_is_replaced(clock):
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record(100, False)
+    clock.advance(30)
+    assert breaker.allow_request()          # this probe never reports back
+    clock.advance(29)
+    assert not breaker.allow_request()
+    clock.advance(1)
+    assert breaker.allow_request()          # replacement probe
+    assert not breaker.allow_request()
+    breaker.record(100, True)
+    assert breaker.state == CLOSED
+
+
+def test_timeout_shrinks_toward_healthy_latency(clock):
+    breaker = make_breaker(clock, timeout_headroom=1.5)
+    assert breaker.effective_timeout() == 5.0
+    for _ in range(3):
+        breaker.record(800, True)
+    assert breaker.effective_timeout() == 5.0   # not enough healthy samples yet
+    breaker.record(800, True)
+    assert breaker.effective_timeout() == pytest.approx(1.2)
+    for _ in range(10):
+        breaker.record(50, True)
+    assert breaker.effective_timeout() == 0.5   # clamped to min_timeout_seconds
+
+
+def test_failures_do_not_shrink_timeout(clock):
+    breaker = make_breaker(clock, max_error_rate=1.0)
+    for _ in range(10):
+        breaker.record(10, False)
+    assert breaker.effective_timeout() == 5.0
+
+
+def test_percentile():
+    assert percentile([], 95) == 0.0
+    assert percentile([3, 1, 2], 50) == 2.0
+    assert percentile(list(range(101)), 95) == 95.0
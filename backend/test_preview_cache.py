@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest  # type: ignore
+from fastapi.testclient import TestClient  # type: ignore
+
+from backend import integration
+from backend.preview_cache import PreviewCache
+
+
+class CountingHandler(SimpleHTTPRequestHandler):
+    """Static file handler standing in for the preview CDN; counts and slows GETs."""
+
+    hits: dict = {}
+    delay = 0.0
+
+    def do_GET(self):
+        CountingHandler.hits[self.path] = CountingHandler.hits.get(self.path, 0) + 1
+        time.sleep(CountingHandler.delay)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def cdn(tmp_path):
+    root = tmp_path / "cdn"
+    root.mkdir()
+    for i in range(5):
+        (root / f"clip{i}.mp3").write_bytes(bytes([i]) * 1000)
+    CountingHandler.hits = {}
+    CountingHandler.delay = 0.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(CountingHandler, directory=str(root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def tracks_for(cdn, n=5):
+    return [{"id": f"t{i}", "preview_url": f"{cdn}/clip{i}.mp3"} for i in range(n)]
+
+
+def test_download_then_hit(cdn, tmp_path):
+    cache = PreviewCache(root=str(tmp_path / "cache"), prefetch_count=0)
+    cache.register(tracks_for(cdn))
+    path = cache.get_path("t1")
+    assert open(path, "rb").read() == b"\x01" * 1000
+    assert cache.get_path("t1") == path
+    assert CountingHandler.hits == {"/clip1.mp3": 1}
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_lru_eviction_by_bytes(cdn, tmp_path):
+    cache = PreviewCache(root=str(tmp_path / "cache"), max_bytes=2500, prefetch_count=0)
+    cache.register(tracks_for(cdn))
+    cache.get_path("t0")
+    cache.get_path("t1")
+    cache.get_path("t0")          # t1 is now least recently used
+    cache.get_path("t2")
+    assert cache.is_cached("t0") and cache.is_cached("t2")
+    assert not cache.is_cached("t1")
+    assert not os.path.exists(os.path.join(cache.root, "t1.mp3"))
+    assert cache.stats()["bytes"] == 2000
+
+
+def test_redownload_replaces_byte_count(cdn, tmp_path):
+    cache = PreviewCache(root=str(tmp_path / "cache"), prefetch_count=0)
+    for _ in range(3):
+        cache._download("t1", f"{cdn}/clip1.mp3")
+    assert cache.stats()["bytes"] == 1000 and cache.stats()["entries"] == 1
+
+
+def test_single_download_under_concurrency(cdn, tmp_path):
+    CountingHandler.delay = 0.2
+    cache = PreviewCache(root=str(tmp_path / "cache"), prefetch_count=0)
+    cache.register(tracks_for(cdn))
+    with ThreadPoolExecutor(8) as pool:
+        paths = list(pool.map(lambda _: cache.get_path("t3"), range(8)))
+    assert len(set(paths)) == 1
+    assert CountingHandler.hits == {"/clip3.mp3": 1}
+
+
+def test_restart_scan_keeps_lru_order(cdn, tmp_path):
+    root = str(tmp_path / "cache")
+    cache = PreviewCache(root=root, prefetch_count=0)
+    cache.register(tracks_for(cdn))
+    for i, track_id in enumerate(("t0", "t1", "t2")):
+        os.utime(cache.get_path(track_id), (1000 + i, 1000 + i))
+    os.utime(os.path.join(root, "t0.mp3"), (2000, 2000))   # most recently played before restart
+
+    restarted = PreviewCache(root=root, max_bytes=2500, prefetch_count=0)
+    assert restarted.stats()["entries"] == 2
+    assert restarted.is_cached("t0") and restarted.is_cached("t2")
+    assert restarted.get_path("t0") == os.path.join(root, "t0.mp3")
+    assert CountingHandler.hits == {"/clip0.mp3": 1, "/clip1.mp3": 1, "/clip2.mp3": 1}
+
+
+def test_prefetch_warms_following_tracks(cdn, tmp_path):
+    cache = PreviewCache(root=str(tmp_path / "cache"), prefetch_count=2)
+    cache.register(tracks_for(cdn))
+    cache.get_path("t0")
+    deadline = time.monotonic() + 5
+    while not (cache.is_cached("t1") and cache.is_cached("t2")) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert cache.is_cached("t1") and cache.is_cached("t2")
+    assert not cache.is_cached("t3")
+
+
+def test_unknown_ids_resolved_once(tmp_path):
+    calls = []
+
+    def resolve(track_id):
+        calls.append(track_id)
+        return None
+
+    cache = PreviewCache(root=str(tmp_path / "cache"), resolve_url=resolve)
+    assert cache.get_path("nopreview") is None
+    assert cache.get_path("nopreview") is None
+    assert cache.get_path("../etc/passwd") is None
+    assert calls == ["nopreview"]
+
+
+def test_endpoint_serves_ranges(cdn, tmp_path, monkeypatch):
+    cache = PreviewCache(root=str(tmp_path / "cache"), prefetch_count=0)
+    cache.register(tracks_for(cdn))
+    monkeypatch.setattr(integration, "previews", cache)
+    client = TestClient(integration.app)
+
+    full = client.get("/api/preview/t4")
+    assert full.status_code == 200 and full.content == b"\x04" * 1000
+
+    part = client.get("/api/preview/t4", headers={"Range": "bytes=100-199"})
+    assert part.status_code == 206
+    assert part.headers["content-range"] == "bytes 100-199/1000"
+    assert part.content == b"\x04" * 100
+    assert CountingHandler.hits == {"/clip4.mp3": 1}
+
+    assert client.get("/api/preview/unregistered").status_code == 404
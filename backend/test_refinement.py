@@ -0,0 +1,138 @@
+import pytest  # type: ignore
+
+from backend import mood_to_playlist as mtp
+from backend import refinement
+from backend.refinement import RefinementSession, SessionStore, apply_delta, select_tracks
+from backend.replay_traffic import StubSpotifyClient
+
+
+@pytest.fixture
+def spec():
+    # genres ['indie', 'pop'], energy (0.55, 0.85), tempo (80, 110)
+    return mtp.interpret_mood("happy", "run", "rock", {}).model_dump()
+
+
+class RecordingClient(StubSpotifyClient):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def fetch_candidates(self, playlist_spec, limit=50, exclude_ids=None, seed_genres=None):
+        self.calls.append({"limit": limit, "exclude": len(exclude_ids or ()), "seed_genres": seed_genres})
+        return super().fetch_candidates(playlist_spec, limit, exclude_ids, seed_genres)
+
+
+# --------------------------
+# apply_delta
+# --------------------------
+def test_apply_delta_widens_single_values(spec):
+    new = apply_delta(spec, {"audio_features": {"energy": 0.95, "tempo_bpm": 150, "valence": [0.1, 0.3],
+                                                "loudness": 0.5, "danceability": None}})
+    assert new["audio_features"]["energy"] == (0.8, 1.0)
+    assert new["audio_features"]["tempo_bpm"] == (127, 172)
+    assert new["audio_features"]["valence"] == (0.1, 0.3)
+    assert new["audio_features"]["danceability"] == spec["audio_features"]["danceability"]
+    assert "loudness" not in new["audio_features"]
+    assert spec["audio_features"]["energy"] == (0.55, 0.85)     # input left untouched
+
+
+def test_apply_delta_genres_and_explicit(spec):
+    new = apply_delta(spec, {"add_genres": ["Hip Hop", "pop", ""], "remove_genres": ["indie"], "avoid_explicit": True})
+    assert new["genres"] == ["hip-hop", "pop"]
+    assert new["constraints"]["avoid_explicit"] is True
+    assert apply_delta(spec, {"remove_genres": ["indie", "pop"]})["genres"] == ["pop"]
+    many = apply_delta(spec, {"add_genres": ["jazz", "rock", "blues", "soul", "funk"]})
+    assert many["genres"] == ["jazz", "rock", "blues", "soul", "funk"]
+
+
+def test_apply_delta_reorders_inverted_range(spec):
+    new = apply_delta(spec, {"audio_features": {"energy": [0.9, 0.2]}})
+    assert new["audio_features"]["energy"] == (0.2, 0.9)
+
+
+# --------------------------
+# select_tracks
+# --------------------------
+def test_select_tracks_fetches_only_when_needed(spec):
+    client = RecordingClient()
+    session = RefinementSession(spec, 10, [])
+    tracks, fetched = select_tracks(session, client, spec, 10)
+    assert len(tracks) == 10 and fetched == 30
+    assert client.calls == [{"limit": 30, "exclude": 0, "seed_genres": ["indie", "pop"]}]
+
+    # same spec again: enough tracks fit and every genre is covered
+    tracks, fetched = select_tracks(session, client, spec, 10)
+    assert fetched == 0 and len(client.calls) == 1
+
+    # a genre the pool never saw is fetched for on its own
+    jazz = apply_delta(spec, {"add_genres": ["jazz"]})
+    _, fetched = select_tracks(session, client, jazz, 10)
+    assert fetched > 0
+    assert client.calls[-1]["seed_genres"] == ["jazz"]
+    assert client.calls[-1]["exclude"] == 30
+
+
+def test_full_pool_is_reranked_without_fetching(spec, monkeypatch):
+    monkeypatch.setattr(refinement, "MAX_POOL_TRACKS", 12)
+    client = RecordingClient()
+    session = RefinementSession(spec, 4, client.fetch_candidates(spec, limit=12))
+    client.calls.clear()
+    # nothing in the pool fits this energy, but the pool is already at its cap
+    low = apply_delta(spec, {"audio_features": {"energy": [0.0, 0.05]}})
+    tracks, fetched = select_tracks(session, client, low, 4)
+    assert fetched == 0 and client.calls == []
+    assert len(tracks) == 4
+
+
+def test_pool_is_trimmed_to_best_candidates(spec, monkeypatch):
+    monkeypatch.setattr(refinement, "MAX_POOL_TRACKS", 12)
+    client = RecordingClient()
+    session = RefinementSession(spec, 4, client.fetch_candidates(spec, limit=10))
+    jazz = apply_delta(spec, {"add_genres": ["jazz"]})
+    tracks, fetched = select_tracks(session, client, jazz, 4)
+    assert fetched > 2 and len(session.pool) == 12
+    ranked = refinement.rank_pool(session.pool, jazz)
+    assert [t["id"] for t in tracks] == [t["id"] for _, t in ranked[:4]]
+    assert session.spec is jazz and session.count == 4
+
+
+# --------------------------
+# SessionStore
+# --------------------------
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_sessions_expire_after_ttl():
+    clock = FakeClock()
+    store = SessionStore(ttl_seconds=60, clock=clock)
+    first, second = RefinementSession({}, 1, []), RefinementSession({}, 1, [])
+    store.add(first)
+    clock.now += 40
+    store.add(second)
+    clock.now += 30                         # first idle 70s, second 30s
+    assert store.get(first.id) is None
+    assert store.get(second.id) is second
+    clock.now += 59                         # the get above refreshed second
+    assert store.get(second.id) is second
+    clock.now += 61
+    assert store.get(second.id) is None and len(store) == 0
+
+
+def test_least_recently_used_session_is_evicted():
+    clock = FakeClock()
+    store = SessionStore(max_sessions=2, clock=clock)
+    a, b, c = (RefinementSession({}, 1, []) for _ in range(3))
+    store.add(a)
+    store.add(b)
+    assert store.get(a.id) is a             # b is now least recently used
+    store.add(c)
+    assert len(store) == 2
+    assert store.get(b.id) is None
+    assert store.get(a.id) is a and store.get(c.id) is c
+    store.discard(a.id)
+    assert store.get(a.id) is None
@@ -0,0 +1,72 @@
+import pytest  # type: ignore
+from fastapi.testclient import TestClient  # type: ignore
+
+from backend import integration
+from backend import mood_to_playlist as mtp
+
+
+@pytest.fixture
+def client(monkeypatch):
+    integration.interpret_cache.clear()
+    integration.search_cache.clear()
+    monkeypatch.setattr(mtp, "USE_LLM", True)   # call_llm is a stub: every spec is a fallback
+    return TestClient(integration.app)
+
+
+def interpret_calls(monkeypatch):
+    calls = []
+    real = integration.interpret_mood
+
+    def counting(**kwargs):
+        calls.append(kwargs["emotion_text"])
+        return real(**kwargs)
+
+    monkeypatch.setattr(integration, "interpret_mood", counting)
+    return calls
+
+
+def test_degraded_spec_revalidates_without_recompute(client, monkeypatch):
+    calls = interpret_calls(monkeypatch)
+    first = client.post("/api/interpret-mood", json={"mood": "happy"})
+    assert first.json()["metadata"]["fallback_used"]
+    again = client.post("/api/interpret-mood", json={"mood": "happy"},
+                        headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+    assert calls == ["happy"]
+    entry = next(iter(integration.interpret_cache._cache._data.values()))
+    assert entry.expires - entry.created == integration.DEGRADED_SPEC_TTL_SECONDS
+
+
+def test_reload_invalidates_only_affected_specs(client, monkeypatch):
+    client.post("/api/interpret-mood", json={"mood": "happy morning"})
+    client.post("/api/interpret-mood", json={"mood": "sad evening"})
+    assert len(integration.interpret_cache) == 2
+
+    integration.invalidate_interpretations(set(), False)
+    assert len(integration.interpret_cache) == 2
+    integration.invalidate_interpretations({"happy"}, False)
+    assert len(integration.interpret_cache) == 1
+    integration.invalidate_interpretations(set(), True)
+    assert len(integration.interpret_cache) == 0
+
+
+def test_noop_reload_notifies_nobody(monkeypatch):
+    seen = []
+    monkeypatch.setattr(mtp, "RELOAD_LISTENERS", [lambda changed, genres: seen.append((changed, genres))])
+    mtp.reload_keyword_index()
+    assert seen == []
+
+
+def test_search_hit_reregisters_previews_from_meta(client, monkeypatch):
+    tracks = [{"id": f"t{i}", "uri": "u", "name": "n", "artists": ["a"],
+               "preview_url": f"http://cdn/{i}.mp3" if i % 2 else None} for i in range(4)]
+    monkeypatch.setattr(integration.spotify, "search_tracks",
+                        lambda playlist_spec, target_count: [dict(t) for t in tracks])
+    registered = []
+    monkeypatch.setattr(integration, "register_previews", registered.append)
+    body = {"spec": {"genres": ["pop"]}, "count": 4}
+    first = client.post("/api/search-tracks", json=body)
+    hit = client.post("/api/search-tracks", json=body, headers={"If-None-Match": first.headers["etag"]})
+    assert hit.status_code == 304
+    assert registered[-1] == [{"id": "t1", "preview_url": "http://cdn/1.mp3"},
+                              {"id": "t3", "preview_url": "http://cdn/3.mp3"}]
@@ -0,0 +1,69 @@
+import html
+import re
+import time
+
+import pytest  # type: ignore
+
+from backend import mood_to_playlist as mtp
+
+
+def legacy_sanitize_text(s: str) -> str:
+    """sanitize_text as it was before the single-pass rewrite (reference only)."""
+    s = re.sub(r"\s+", " ", s.strip())
+    s = re.sub(r"\b[\w\.-]+@[\w\.-]+\.\w+\b", "<REDACTED_EMAIL>", s)
+    s = re.sub(r"\b(\+?\d[\d\-\s]{6,}\d)\b", "<REDACTED_PHONE>", s)
+    return html.escape(s)[:500]
+
+
+PII_INPUTS = [
+    "call me:555-123-4567",
+    "phone:+15551234567",
+    "(555)123-4567",
+    "number=5551234567",
+    "tel:5551234567",
+    "5551234567,5559876543",
+    "555-1234567/555-7654321",
+    "call me at 555-123-4567 or a@b.com please",
+    "+1 555 123 4567 ok",
+    "tel: 555 123 4567.",
+    "mail john.doe@example.co.uk, thanks",
+    "id 12 34 and 1234567",
+    "order 5551234567abc then 555 1234",
+    "12345678_9",
+]
+
+
+@pytest.mark.parametrize("text", PII_INPUTS)
+def test_redaction_matches_legacy(text):
+    assert mtp.sanitize_text(text) == legacy_sanitize_text(text)
+
+
+@pytest.mark.parametrize("text", PII_INPUTS)
+def test_redact_pii_matches_legacy(text):
+    assert html.escape(mtp.redact_pii(text)) == legacy_sanitize_text(text)
+
+
+def test_words_exclude_pii_and_markup():
+    clean, words = mtp.preprocess_text("Happy <b>vibes</b> & jazz, ping me:555-123-4567 or me@x.io")
+    assert "&lt;b&gt;" in clean
+    assert words == ["happy", "b", "vibes", "b", "jazz", "ping", "me", "or"]
+
+
+def test_adversarial_input_is_bounded():
+    for body in ("1 " * 500000 + "a", "1-" * 500000, "a." * 500000 + "@", "<&>" * 300000):
+        started = time.perf_counter()
+        mtp.preprocess_text(body)
+        assert time.perf_counter() - started < 0.05
+
+
+def test_interpret_request_rejects_oversized_fields():
+    from fastapi.testclient import TestClient  # type: ignore
+    from backend import integration
+
+    client = TestClient(integration.app)
+    limit = integration.MAX_INPUT_CHARS
+    assert client.post("/api/interpret-mood", json={"mood": "x" * (limit + 1)}).status_code == 422
+    assert client.post("/api/interpret-mood", json={"mood": "ok", "music": "x" * (limit + 1)}).status_code == 422
+    genres = ["pop"] * (integration.MAX_REQUEST_GENRES + 1)
+    assert client.post("/api/interpret-mood", json={"mood": "ok", "genres": genres}).status_code == 422
+    assert client.post("/api/interpret-mood", json={"mood": "x" * limit, "genres": ["pop"]}).status_code == 200
@@ -0,0 +1,113 @@
+import os
+
+os.environ.setdefault("VIBECHEF_SEED_GENRES_OFFLINE", "1")
+
+import pytest  # type: ignore
+
+from backend.seed_genres import SeedGenreIndex
+from backend.spotify_client import SpotifyClient
+
+
+@pytest.fixture
+def index(tmp_path):
+    return SeedGenreIndex(cache_path=str(tmp_path / "seeds.json"), offline=True)
+
+
+class FakeSpotify:
+    """Records upstream calls; recommendations reject invalid seeds like Spotify does."""
+
+    def __init__(self, valid_seeds):
+        self.valid_seeds = valid_seeds
+        self.calls = []
+
+    def recommendations(self, seed_genres, limit=20, **params):
+        self.calls.append(("recommendations", tuple(seed_genres)))
+        assert seed_genres and set(seed_genres) <= self.valid_seeds
+        return {"tracks": [self._track(f"r{seed_genres[0]}{i}") for i in range(min(limit, 10))]}
+
+    def search(self, q, type="track", limit=10, offset=0):
+        self.calls.append(("search", q))
+        return {"tracks": {"items": [self._track(f"s{q}{offset}-{i}") for i in range(limit)]}}
+
+    def audio_features(self, ids):
+        return [{"energy": 0.5, "valence": 0.5} for _ in ids]
+
+    @staticmethod
+    def _track(track_id):
+        return {"uri": f"spotify:track:{track_id}", "id": track_id, "name": track_id,
+                "artists": [{"name": "Artist"}], "explicit": False, "popularity": 10}
+
+
+@pytest.fixture
+def client(index):
+    c = SpotifyClient.__new__(SpotifyClient)
+    c.sp = FakeSpotify(set(index.seeds))
+    c.seed_genres = index
+    return c
+
+
+def test_offline_index_uses_fixture(tmp_path):
+    stale = tmp_path / "seeds.json"
+    stale.write_text('{"fetched_at": 1, "genres": ["pop"]}')
+    index = SeedGenreIndex(cache_path=str(stale), offline=True)
+    assert index.source == "fixture"
+    assert len(index.seeds) == 126
+    index.maybe_refresh()   # no fetcher offline: never calls upstream
+
+
+@pytest.mark.parametrize("genre, seeds", [
+    ("pop", ["pop"]),
+    ("Hip Hop", ["hip-hop"]),
+    ("hiphop", ["hip-hop"]),
+    ("r&b", ["r-n-b"]),
+    ("synthpop", ["synth-pop"]),
+    ("lo-fi", ["chill", "study"]),
+    ("psychedelic", ["psych-rock"]),
+    ("electronica", ["electronic"]),
+    ("classic rock", ["rock"]),
+    ("tropical house", ["house"]),
+    ("polka", []),
+])
+def test_closest_seeds(index, genre, seeds):
+    assert index.closest_seeds(genre) == seeds
+
+
+def test_resolve_dedups_caps_and_counts(index):
+    assert index.resolve(["lo-fi", "chill", "polka", "rock", "jazz", "pop", "blues"]) == \
+        ["chill", "study", "rock", "jazz", "pop"]
+    snap = index.snapshot()
+    assert snap["lookups"] == 7
+    assert snap["genres"]["polka"] == {"lookups": 1, "hits": 0, "hit_rate": 0.0, "seeds": []}
+    assert snap["genres"]["lo-fi"]["seeds"] == ["chill", "study"]
+
+
+def test_search_tracks_maps_genres(client):
+    tracks = client.search_tracks({"genres": ["hiphop", "polka"]}, target_count=5)
+    assert len(tracks) == 5
+    assert client.sp.calls == [("recommendations", ("hip-hop",))]
+    assert client.seed_genres.snapshot()["recommendations"]["hip-hop"] == {"calls": 1, "empty": 0}
+
+
+def test_search_tracks_skips_recommendations_without_seeds(client):
+    tracks = client.search_tracks({"genres": ["polka"], "mood_descriptors": ["happy"]}, target_count=5)
+    assert len(tracks) == 5
+    assert client.sp.calls == [("search", "happy")]
+    assert client.seed_genres.snapshot()["skipped_calls"] == 1
+
+
+def test_fetch_candidates_without_seeds_makes_no_call(client):
+    assert client.fetch_candidates({"genres": ["polka"]}) == []
+    assert client.sp.calls == []
+
+
+def test_fetch_candidates_tags_spec_genres(client):
+    tracks = client.fetch_candidates({"genres": ["classic rock"]}, limit=3)
+    assert client.sp.calls == [("recommendations", ("rock",))]
+    assert tracks and all(t["seed_genres"] == ["classic rock"] for t in tracks)
+
+
+def test_large_playlist_without_seeds_only_searches(client):
+    spec = {"genres": ["polka"], "mood_descriptors": ["happy", "sunny"]}
+    produced = sum(len(batch) for batch in client.iter_large_playlist(spec, 250))
+    assert produced == 250
+    assert {name for name, _ in client.sp.calls} == {"search"}
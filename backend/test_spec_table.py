@@ -0,0 +1,49 @@
+import pytest  # type: ignore
+
+from backend import mood_to_playlist as mtp
+from backend.build_spec_table import build_entries
+from backend.util.spec_table import SpecTable, write_spec_table
+
+
+PAIRS = [("happy", "chill"), ("sad", "workout"), ("chill", "happy")]   # order matters: both directions
+
+
+@pytest.fixture
+def keyword_map():
+    return mtp.KEYWORD_INDEX.keyword_map
+
+
+@pytest.fixture
+def table_path(tmp_path, keyword_map):
+    path = tmp_path / "spec_table.bin"
+    write_spec_table(str(path), build_entries(PAIRS), mtp.keyword_map_digest(keyword_map))
+    return path
+
+
+def test_lookup_matches_fresh_merge(table_path, keyword_map):
+    table = SpecTable.open(str(table_path), expected_digest=mtp.keyword_map_digest(keyword_map))
+    assert table is not None
+    try:
+        for key in [(k,) for k in keyword_map] + PAIRS:
+            assert table.lookup(key) == mtp.merge_keyword_entries(list(key), keyword_map), key
+        assert table.lookup(("happy", "sad")) is None     # pair not in the table
+        assert table.lookup(("no-such-keyword",)) is None
+    finally:
+        table.close()
+
+
+def test_rejects_table_built_from_other_data(table_path):
+    assert SpecTable.open(str(table_path), expected_digest=b"\x01" * 32) is None
+    table = SpecTable.open(str(table_path))                 # no digest check requested
+    assert table is not None
+    table.close()
+
+
+def test_rejects_truncated_or_foreign_files(tmp_path, table_path):
+    data = table_path.read_bytes()
+    for name, content in [("short-blob", data[:-1]), ("short-records", data[:100]),
+                          ("header-only", data[:10]), ("empty", b""), ("foreign", b"PK\x03\x04" + data[4:])]:
+        path = tmp_path / name
+        path.write_bytes(content)
+        assert SpecTable.open(str(path)) is None, name
+    assert SpecTable.open(str(tmp_path / "missing.bin")) is None
@@ -0,0 +1,63 @@
+import asyncio
+import json
+import time
+
+import httpx  # type: ignore
+
+from backend import integration
+from backend import replay_traffic
+from backend.traffic_recorder import TrafficRecorderMiddleware
+
+
+def record_session(log_path):
+    """Drives the app through the recorder: interpret, start a refinement session, tweak it twice."""
+    recorder = TrafficRecorderMiddleware(integration.app, path=str(log_path))
+
+    async def run():
+        transport = httpx.ASGITransport(app=recorder)
+        async with httpx.AsyncClient(transport=transport, base_url="http://rec.local") as client:
+            spec = (await client.post("/api/interpret-mood",
+                                      json={"mood": "happy", "activity": "call 555-123-4567"})).json()
+            started = (await client.post("/api/refine/sessions", json={"spec": spec, "count": 5})).json()
+            for energy in (0.9, 0.2):
+                await client.post(f"/api/refine/{started['session_id']}",
+                                  json={"audio_features": {"energy": energy}})
+            return started["session_id"]
+
+    session_id = asyncio.run(run())
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline and len(log_path.read_text().splitlines()) < 4:
+        time.sleep(0.01)
+    return session_id
+
+
+def test_recorded_refine_traffic_replays_by_route(tmp_path, monkeypatch):
+    monkeypatch.setattr(integration, "spotify", replay_traffic.StubSpotifyClient())
+    log = tmp_path / "traffic.jsonl"
+    session_id = record_session(log)
+
+    lines = [json.loads(line) for line in log.read_text().splitlines()]
+    assert [r["route"] for r in lines] == [
+        "/api/interpret-mood", "/api/refine/sessions", "/api/refine/{session_id}", "/api/refine/{session_id}",
+    ]
+    assert "555-123-4567" not in log.read_text()
+    assert lines[1]["issued"] == {"session_id": session_id}
+    assert lines[2]["path_params"] == {"session_id": session_id}
+
+    async def run():
+        async with replay_traffic.build_local_client(0, 0) as client:
+            # one worker keeps the session creation ahead of its tweaks
+            return await replay_traffic.replay(iter(replay_traffic.load_records(str(log))), client, 0, 1)
+
+    results, elapsed = asyncio.run(run())
+    report = replay_traffic.summarize(results, elapsed)
+    assert set(report) == {"/api/interpret-mood", "/api/refine/sessions", "/api/refine/{session_id}"}
+    assert report["/api/refine/{session_id}"]["requests"] == 2
+    assert all(r["error_rate"] == 0.0 for r in report.values())
+
+
+def test_refine_without_reissued_session_is_skipped():
+    rec = {"path": "/api/refine/abc", "route": "/api/refine/{session_id}", "path_params": {"session_id": "abc"}}
+    assert replay_traffic.live_path(rec, {}) is None
+    assert replay_traffic.live_path(rec, {"abc": "new"}) == "/api/refine/new"
+    assert replay_traffic.live_path({"path": "/api/preview/t1"}, {}) == "/api/preview/t1"
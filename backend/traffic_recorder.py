@@ -0,0 +1,120 @@
+from __future__ import annotations
+import json
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .mood_to_playlist import redact_pii
+
+# Bodies above this size are recorded as null rather than truncated JSON
+MAX_RECORDED_BODY_BYTES = 64 * 1024
+# Routes whose response issues an id that later requests put in their path; the
+# id is recorded so replay can map it onto the one the replayed server issues
+ID_ISSUING_ROUTES = {"/api/refine/sessions": "session_id"}
+
+
+def sanitize_body(value: Any) -> Any:
+    """Recursively redact PII from every string in a decoded JSON body."""
+    if isinstance(value, str):
+        return redact_pii(value)
+    if isinstance(value, list):
+        return [sanitize_body(v) for v in value]
+    if isinstance(value, dict):
+        return {k: sanitize_body(v) for k, v in value.items()}
+    return value
+
+
+class TrafficRecorderMiddleware:
+    """
+    ASGI middleware that appends one JSONL record per `/api/*` request:
+
+        {"ts": ..., "method": "POST", "path": "/api/refine/8b72...",
+         "route": "/api/refine/{session_id}", "path_params": {"session_id": "8b72..."},
+         "body": {...sanitized...}, "status": 200, "latency_ms": 12.3}
+
+    Records go through a queue to a background writer thread, so the event
+    loop never blocks on file I/O. The log is the input format of
+    `backend.replay_traffic`.
+    """
+
+    def __init__(self, app: Any, path: str, prefix: str = "/api/") -> None:
+        self.app = app
+        self.prefix = prefix
+        self._queue: "queue.SimpleQueue[Dict[str, Any]]" = queue.SimpleQueue()
+        self._fh = open(path, "a", encoding="utf-8")
+        self._writer = threading.Thread(target=self._drain, name="traffic-recorder", daemon=True)
+        self._writer.start()
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope.get("type") != "http" or not scope.get("path", "").startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        chunks = []
+        response_chunks: List[bytes] = []
+        status = {"code": 500}
+        start = time.perf_counter()
+        issued_key = ID_ISSUING_ROUTES.get(scope.get("path", ""))
+
+        async def recording_receive() -> Dict[str, Any]:
+            message = await receive()
+            if message.get("type") == "http.request":
+                chunks.append(message.get("body", b""))
+            return message
+
+        async def recording_send(message: Dict[str, Any]) -> None:
+            if message.get("type") == "http.response.start":
+                status["code"] = message.get("status", 500)
+            elif issued_key and message.get("type") == "http.response.body":
+                response_chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, recording_receive, recording_send)
+        finally:
+            route = scope.get("route")
+            record = {
+                "ts": round(time.time(), 3),
+                "method": scope.get("method", "GET"),
+                "path": scope["path"],
+                # the template groups /api/refine/<id> etc. into one endpoint
+                "route": getattr(route, "path", None) or scope["path"],
+                "path_params": scope.get("path_params") or {},
+                "body": self._decode_body(b"".join(chunks)),
+                "status": status["code"],
+                "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            }
+            if issued_key:
+                issued = self._issued_id(b"".join(response_chunks), issued_key)
+                if issued:
+                    record["issued"] = {issued_key: issued}
+            self._queue.put(record)
+
+    @staticmethod
+    def _decode_body(raw: bytes) -> Optional[Any]:
+        if not raw or len(raw) > MAX_RECORDED_BODY_BYTES:
+            return None
+        try:
+            return sanitize_body(json.loads(raw))
+        except (ValueError, UnicodeDecodeError):
+            return None
+
+    @staticmethod
+    def _issued_id(raw: bytes, key: str) -> Optional[str]:
+        try:
+            value = json.loads(raw).get(key)
+        except (ValueError, UnicodeDecodeError, AttributeError):
+            return None
+        return value if isinstance(value, str) else None
+
+    def _drain(self) -> None:
+        while True:
+            record = self._queue.get()
+            try:
+                self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+                # flush once per burst rather than per record
+                if self._queue.empty():
+                    self._fh.flush()
+            except Exception as e:
+                print(f"Error writing traffic record: {e}")
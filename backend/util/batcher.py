@@ -0,0 +1,101 @@
+from __future__ import annotations
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+
+class MicroBatcher:
+    """
+    Collects items submitted concurrently from many threads and hands them to
+    `send_batch` together.
+
+    A batch is flushed when it reaches `max_batch_size` items or when
+    `max_wait_ms` has elapsed since its first item arrived, so the latency
+    added to any single item is bounded by `max_wait_ms`.
+
+    Up to `max_in_flight` batches are sent concurrently; while all slots are
+    busy, new items keep queueing (and so form fuller batches). Items whose
+    Future was cancelled before their batch went out (callers that gave up
+    waiting) are dropped rather than sent.
+
+    `send_batch(items)` must return one result per item, in order. Missing
+    trailing results, and every result of a batch whose send raised, resolve
+    to None so callers can fall back per item.
+    """
+
+    def __init__(
+        self,
+        send_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        name: str = "micro-batcher",
+        max_in_flight: int = 4,
+    ) -> None:
+        self.send_batch = send_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = float(max_wait_ms)
+        self.name = name
+        self.max_in_flight = max(1, int(max_in_flight))
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._senders = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix=name)
+        self._queue: "queue.Queue[Tuple[Any, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.batches_sent = 0
+        self.items_sent = 0
+        self.items_dropped = 0
+
+    def submit(self, item: Any) -> Future:
+        """Queue an item; the returned Future resolves to its batch result."""
+        self._ensure_worker()
+        fut: Future = Future()
+        self._queue.put((item, fut))
+        return fut
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> List[Tuple[Any, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            self._slots.acquire()
+            collected = self._collect()
+            # marks the rest running, so late cancels can't race the send
+            batch = [(item, fut) for item, fut in collected if fut.set_running_or_notify_cancel()]
+            self.items_dropped += len(collected) - len(batch)
+            if not batch:
+                self._slots.release()
+                continue
+            self._senders.submit(self._send, batch)
+
+    def _send(self, batch: List[Tuple[Any, Future]]) -> None:
+        try:
+            try:
+                results = list(self.send_batch([item for item, _ in batch]) or [])
+            except Exception:
+                results = []
+            self.batches_sent += 1
+            self.items_sent += len(batch)
+            for i, (_, fut) in enumerate(batch):
+                fut.set_result(results[i] if i < len(results) else None)
+        finally:
+            self._slots.release()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class BoundedCache:
+    """
+    Size-bounded dict cache with lock-free reads.
+
+    `get` is a single dict lookup (atomic under the GIL), so hot read paths
+    never contend. Writers serialize on a lock and evict in insertion order
+    once `max_entries` is reached. Cached values are shared between callers
+    and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = 4096, data: Optional[Dict[Hashable, Any]] = None) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self._data: Dict[Hashable, Any] = dict(data or {})
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self._data.get(key, default)
+        if value is default:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.max_entries:
+                # dicts keep insertion order: drop the oldest entry
+                self._data.pop(next(iter(self._data)), None)
+            self._data[key] = value
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drops every key matching predicate. Returns the number dropped."""
+        with self._lock:
+            doomed = [k for k in self._data if predicate(k)]
+            for k in doomed:
+                del self._data[k]
+        return len(doomed)
+
+    def invalidate_items(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Like invalidate, but the predicate also sees the cached value."""
+        with self._lock:
+            doomed = [k for k, v in self._data.items() if predicate(k, v)]
+            for k in doomed:
+                del self._data[k]
+        return len(doomed)
+
+    def copy(self, exclude: Optional[Callable[[Hashable], bool]] = None) -> "BoundedCache":
+        """New cache with the same entries, minus those matching `exclude`."""
+        with self._lock:
+            data = {k: v for k, v in self._data.items() if exclude is None or not exclude(k)}
+        return BoundedCache(self.max_entries, data)
+
+    def __len__(self) -> int:
+        return len(self._data)
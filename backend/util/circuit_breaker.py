@@ -0,0 +1,172 @@
+from __future__ import annotations
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+# Breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list (0.0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = int(round(pct / 100.0 * (len(ordered) - 1)))
+    return float(ordered[max(0, min(len(ordered) - 1, rank))])
+
+
+class CircuitBreaker:
+    """
+    Latency/error-rate circuit breaker for a flaky upstream (the LLM provider).
+
+    Keeps a rolling window of the last `window` calls. Trips OPEN when the
+    window's error rate or p95 latency breaches its threshold; after
+    `cooldown_seconds` it lets a single probe through (HALF_OPEN) and closes
+    again only if that probe is healthy. A probe that never reports back
+    (raised, cancelled) is replaced by a new one after another cooldown.
+
+    The effective timeout shrinks toward observed healthy latency
+    (p95 of successful calls * `timeout_headroom`), bounded by
+    [min_timeout_seconds, max_timeout_seconds].
+    """
+
+    def __init__(
+        self,
+        window: int = 50,
+        min_samples: int = 10,
+        max_error_rate: float = 0.5,
+        max_p95_ms: float = 3000.0,
+        cooldown_seconds: float = 30.0,
+        max_timeout_seconds: float = 5.0,
+        min_timeout_seconds: float = 1.0,
+        timeout_headroom: float = 1.5,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.window = window
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.max_p95_ms = max_p95_ms
+        self.cooldown_seconds = cooldown_seconds
+        self.max_timeout_seconds = max_timeout_seconds
+        self.min_timeout_seconds = min_timeout_seconds
+        self.timeout_headroom = timeout_headroom
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (latency_ms, ok)
+        self._samples: Deque[Tuple[float, bool]] = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._trips = 0
+        self._short_circuited = 0
+        self._last_trip_reason = ""
+
+    # --------------------------
+    # Call gating
+    # --------------------------
+    def allow_request(self) -> bool:
+        """Return True if the caller may hit the upstream right now."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and self._clock() - self._opened_at >= self.cooldown_seconds:
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == HALF_OPEN and (
+                not self._probe_in_flight or self._clock() - self._probe_started >= self.cooldown_seconds
+            ):
+                self._probe_in_flight = True
+                self._probe_started = self._clock()
+                return True
+            self._short_circuited += 1
+            return False
+
+    def record(self, latency_ms: float, ok: bool) -> None:
+        """Record the outcome of a call that allow_request() let through."""
+        with self._lock:
+            self._samples.append((float(latency_ms), bool(ok)))
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+                if ok and latency_ms <= self.max_p95_ms:
+                    self._state = CLOSED
+                    self._samples.clear()
+                    self._samples.append((float(latency_ms), True))
+                else:
+                    self._trip("half-open probe failed")
+                return
+            if self._state == CLOSED:
+                reason = self._breach_reason()
+                if reason:
+                    self._trip(reason)
+
+    def effective_timeout(self) -> float:
+        """Timeout (seconds) to use for the next call."""
+        with self._lock:
+            return self._effective_timeout()
+
+    # --------------------------
+    # Reporting
+    # --------------------------
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Metrics view of the breaker, safe to serialize as JSON."""
+        with self._lock:
+            latencies = [lat for lat, _ in self._samples]
+            return {
+                "state": self._state,
+                "samples": len(self._samples),
+                "error_rate": round(self._error_rate(), 3),
+                "p95_latency_ms": round(percentile(latencies, 95), 1),
+                "effective_timeout_seconds": round(self._effective_timeout(), 3),
+                "trips": self._trips,
+                "short_circuited": self._short_circuited,
+                "last_trip_reason": self._last_trip_reason,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._state = CLOSED
+            self._probe_in_flight = False
+
+    # --------------------------
+    # Internals (caller holds the lock)
+    # --------------------------
+    def _error_rate(self) -> float:
+        if not self._samples:
+            return 0.0
+        errors = sum(1 for _, ok in self._samples if not ok)
+        return errors / len(self._samples)
+
+    def _breach_reason(self) -> Optional[str]:
+        if len(self._samples) < self.min_samples:
+            return None
+        error_rate = self._error_rate()
+        if error_rate > self.max_error_rate:
+            return f"error rate {error_rate:.2f} > {self.max_error_rate:.2f}"
+        p95 = percentile([lat for lat, _ in self._samples], 95)
+        if p95 > self.max_p95_ms:
+            return f"p95 latency {p95:.0f}ms > {self.max_p95_ms:.0f}ms"
+        return None
+
+    def _trip(self, reason: str) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._trips += 1
+        self._last_trip_reason = reason
+
+    def _effective_timeout(self) -> float:
+        healthy = [lat for lat, ok in self._samples if ok]
+        if len(healthy) < self.min_samples:
+            return self.max_timeout_seconds
+        target = percentile(healthy, 95) / 1000.0 * self.timeout_headroom
+        return max(self.min_timeout_seconds, min(self.max_timeout_seconds, target))
@@ -0,0 +1,130 @@
+from __future__ import annotations
+import gzip
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request, Response  # type: ignore
+
+# Optional accelerators: orjson for encoding, brotli for Content-Encoding: br
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+try:
+    import brotli  # type: ignore
+except ImportError:
+    brotli = None
+
+from .cache import BoundedCache
+
+COMPRESS_MIN_BYTES = 1024   # smaller bodies aren't worth the CPU or the header
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact JSON bytes (orjson when installed; tuples become arrays either way)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def request_key(endpoint: str, payload: Any) -> str:
+    """Stable cache key for a request body."""
+    canonical = json.dumps([endpoint, payload], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class CachedBody:
+    """
+    Serialized JSON body plus its ETag and lazily built compressed variants.
+    `meta` is caller data kept next to the body (what to invalidate it on,
+    what to re-register on a hit) so hits never re-parse the body.
+    """
+
+    __slots__ = ("body", "etag", "created", "expires", "meta", "_encoded", "_lock")
+
+    def __init__(self, body: bytes, ttl_seconds: float = 0.0, meta: Any = None) -> None:
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        self.created = time.monotonic()
+        self.expires = self.created + ttl_seconds
+        self.meta = meta
+        self._encoded: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.body
+        data = self._encoded.get(encoding)
+        if data is None:
+            if encoding == "br":
+                data = brotli.compress(self.body, quality=BROTLI_QUALITY)
+            else:
+                data = gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0)
+            with self._lock:
+                self._encoded[encoding] = data
+        return data
+
+
+class ResponseCache:
+    """BoundedCache of CachedBody entries that expire after ttl_seconds (or a per-entry TTL)."""
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 300.0) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._cache = BoundedCache(max_entries)
+
+    def get(self, key: str) -> Optional[CachedBody]:
+        entry = self._cache.get(key)
+        if entry is None or time.monotonic() > entry.expires:
+            return None
+        return entry
+
+    def put(self, key: str, body: bytes, meta: Any = None, ttl_seconds: Optional[float] = None) -> CachedBody:
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        entry = CachedBody(body, ttl, meta)
+        self._cache.put(key, entry)
+        return entry
+
+    def invalidate(self, predicate: Callable[[CachedBody], bool]) -> int:
+        """Drops entries matching predicate. Returns the number dropped."""
+        return self._cache.invalidate_items(lambda key, entry: predicate(entry))
+
+    def clear(self) -> int:
+        """Drops every entry. Returns the number dropped."""
+        return self._cache.invalidate(lambda key: True)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+def negotiate_encoding(accept_encoding: str, size: int) -> Optional[str]:
+    if size < COMPRESS_MIN_BYTES:
+        return None
+    offered = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    if "br" in offered and brotli is not None:
+        return "br"
+    if "gzip" in offered:
+        return "gzip"
+    return None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def json_response(request: Request, entry: CachedBody) -> Response:
+    """200 with the (possibly compressed) cached body, or 304 if the client has it."""
+    headers = {"ETag": entry.etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""), len(entry.body))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=entry.encoded(encoding), media_type="application/json", headers=headers)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+import hashlib
+import mmap
+import os
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Binary layout (little endian):
+#   header : magic "VCST", format version, record count, blob size, 32-byte source digest
+#   records: fixed-size, sorted by key hash -> binary search straight on the mmap
+#   blob   : UTF-8 "key \x1e genres \x1e descriptors" segments, lists joined by \x1f
+MAGIC = b"VCST"
+FORMAT_VERSION = 2
+FEATURES = ("energy", "valence", "danceability", "acousticness", "instrumentalness", "tempo_bpm")
+
+_HEADER = struct.Struct("<4sHxxIQ32s")
+_RECORD = struct.Struct("<QB7x12dII")
+_FIELD_SEP = "\x1e"
+_ITEM_SEP = "\x1f"
+
+# (genres, descriptors, merged audio features present for this key)
+SpecTableEntry = Tuple[List[str], List[str], Dict[str, Tuple[float, float]]]
+
+
+def key_string(keywords: Sequence[str]) -> str:
+    return _ITEM_SEP.join(keywords)
+
+
+def key_hash(key: str) -> int:
+    # stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def write_spec_table(path: str, entries: Dict[Tuple[str, ...], SpecTableEntry], digest: bytes) -> int:
+    """Serialize entries to `path` atomically. Returns the number of records written."""
+    records = []
+    blob = bytearray()
+    for keywords, (genres, descriptors, features) in entries.items():
+        key = key_string(keywords)
+        segment = _FIELD_SEP.join([key, _ITEM_SEP.join(genres), _ITEM_SEP.join(descriptors)]).encode("utf-8")
+        mask = 0
+        values: List[float] = []
+        for i, name in enumerate(FEATURES):
+            lo, hi = features.get(name, (0.0, 0.0))
+            if name in features:
+                mask |= 1 << i
+            values.extend((float(lo), float(hi)))
+        records.append((key_hash(key), mask, values, len(blob), len(segment)))
+        blob.extend(segment)
+    records.sort(key=lambda r: r[0])
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(records), len(blob), digest[:32].ljust(32, b"\0")))
+        for h, mask, values, off, length in records:
+            fh.write(_RECORD.pack(h, mask, *values, off, length))
+        fh.write(bytes(blob))
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+class SpecTable:
+    """
+    Read-only view over a precomputed spec table file.
+
+    The file is mapped with mmap (ACCESS_READ), so every worker process
+    opening the same artifact shares one copy of it in the page cache.
+    """
+
+    def __init__(self, fh, mm: mmap.mmap, count: int, digest: bytes) -> None:
+        self._fh = fh
+        self._mm = mm
+        self.count = count
+        self.digest = digest
+        self._blob_offset = _HEADER.size + count * _RECORD.size
+
+    @classmethod
+    def open(cls, path: str, expected_digest: Optional[bytes] = None) -> Optional["SpecTable"]:
+        """Map `path`; returns None if missing, malformed or built from other sources."""
+        try:
+            fh = open(path, "rb")
+        except OSError:
+            return None
+        try:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            fh.close()
+            return None
+        try:
+            magic, version, count, blob_size, digest = _HEADER.unpack_from(mm, 0)
+        except struct.error:
+            magic, version, count, blob_size, digest = b"", 0, 0, 0, b""
+        valid = (
+            magic == MAGIC
+            and version == FORMAT_VERSION
+            # a truncated copy would otherwise decode garbage from a short blob
+            and len(mm) == _HEADER.size + count * _RECORD.size + blob_size
+            and (expected_digest is None or digest == expected_digest[:32].ljust(32, b"\0"))
+        )
+        if not valid:
+            mm.close()
+            fh.close()
+            return None
+        return cls(fh, mm, count, digest)
+
+    def lookup(self, keywords: Sequence[str]) -> Optional[SpecTableEntry]:
+        key = key_string(keywords)
+        h = key_hash(key)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._hash_at(mid) < h:
+                lo = mid + 1
+            else:
+                hi = mid
+        # walk the (normally single) records sharing this hash
+        i = lo
+        while i < self.count and self._hash_at(i) == h:
+            entry = self._decode(i, key)
+            if entry is not None:
+                return entry
+            i += 1
+        return None
+
+    def close(self) -> None:
+        self._mm.close()
+        self._fh.close()
+
+    def _hash_at(self, i: int) -> int:
+        return struct.unpack_from("<Q", self._mm, _HEADER.size + i * _RECORD.size)[0]
+
+    def _decode(self, i: int, key: str) -> Optional[SpecTableEntry]:
+        fields = _RECORD.unpack_from(self._mm, _HEADER.size + i * _RECORD.size)
+        mask, values, off, length = fields[1], fields[2:14], fields[14], fields[15]
+        start = self._blob_offset + off
+        stored_key, genres, descriptors = self._mm[start:start + length].decode("utf-8").split(_FIELD_SEP)
+        if stored_key != key:
+            return None
+        features: Dict[str, Tuple[float, float]] = {}
+        for j, name in enumerate(FEATURES):
+            if mask & (1 << j):
+                lo, hi = values[2 * j], values[2 * j + 1]
+                features[name] = (int(lo), int(hi)) if name == "tempo_bpm" else (lo, hi)
+        return (
+            genres.split(_ITEM_SEP) if genres else [],
+            descriptors.split(_ITEM_SEP) if descriptors else [],
+            features,
+        )
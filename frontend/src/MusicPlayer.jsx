@@ -66,7 +66,8 @@ const MusicPlayer = ({ tracks = [] }) => {
       id: track.id || Math.random(),
       title: track.name || track.title || 'Unknown Track',
       artist: Array.isArray(track.artists) ? track.artists.join(', ') : (track.artist || 'Unknown Artist'),
-      url: track.preview_url || track.url || sampleTracks[index % sampleTracks.length].url
+      // Prefer the backend's caching proxy; it supports seeking via range requests
+      url: track.preview_proxy_url || track.preview_url || track.url || sampleTracks[index % sampleTracks.length].url
     }));
   };
 